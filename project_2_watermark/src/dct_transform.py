@@ -1,3 +1,5 @@
+from functools import lru_cache
+
 import numpy as np
 from scipy.fftpack import dct, idct
 
@@ -27,3 +29,30 @@ def generate_dct_matrix(n):
             else:
                 matrix[i, j] = np.sqrt(2 / n) * np.cos((2*j + 1)*i*np.pi / (2*n))
     return matrix
+
+
+@lru_cache(maxsize=None)
+def _cached_dct_matrix(n):
+    """按块大小缓存的只读DCT矩阵"""
+    matrix = generate_dct_matrix(n)
+    matrix.setflags(write=False)
+    return matrix
+
+def image_to_blocks(image, block_size=8):
+    """将二维图像的完整块区域视为(H/b, W/b, b, b)的块数组（视图，不复制）
+
+    右侧和下侧不足一个块的边缘被忽略，块按行优先顺序排列。
+    """
+    rows, cols = image.shape[0] // block_size, image.shape[1] // block_size
+    region = image[:rows * block_size, :cols * block_size]
+    return region.reshape(rows, block_size, cols, block_size).swapaxes(1, 2)
+
+def blockwise_dct(blocks):
+    """对最后两个轴上的所有块同时做二维DCT：D = C·B·Cᵀ"""
+    matrix = _cached_dct_matrix(blocks.shape[-1])
+    return matrix @ blocks @ matrix.T
+
+def basis_pattern(block_size, u, v):
+    """DCT基函数(u, v)的空间域图样：对块加上delta·图样等价于DCT系数(u, v)加delta"""
+    matrix = _cached_dct_matrix(block_size)
+    return np.outer(matrix[u], matrix[v])
@@ -22,10 +22,15 @@ def binary_to_text(binary):
     return text
 
 
-def normalize_image(image):
-    """将图像像素值归一化到0-255范围"""
-    img_min = np.min(image)
-    img_max = np.max(image)
+def normalize_image(image, value_range=None):
+    """将图像像素值归一化到0-255范围
+
+    value_range: 可选的(最小值, 最大值)；分块处理时传入全图的范围，使各块的映射一致
+    """
+    if value_range is None:
+        img_min, img_max = np.min(image), np.max(image)
+    else:
+        img_min, img_max = value_range
     if img_max - img_min == 0:
         return np.zeros_like(image, dtype=np.uint8)
     return ((image - img_min) / (img_max - img_min) * 255).astype(np.uint8)
@@ -43,6 +48,54 @@ def load_image(image_path):
         return None
 
 
+class ImageRegionReader:
+    """按区域读取图像文件：reader[top:bottom, left:right] 返回该区域的RGB numpy数组
+
+    未压缩格式（如PPM）由PIL直接内存映射文件；PNG/JPEG等压缩格式在首次读取时仍会整体解码。
+    """
+
+    def __init__(self, image_path):
+        self._image = Image.open(image_path)
+        width, height = self._image.size
+        self.shape = (height, width, 3)
+
+    def __getitem__(self, key):
+        rows, cols = key
+        top, bottom, _ = rows.indices(self.shape[0])
+        left, right, _ = cols.indices(self.shape[1])
+        region = self._image.crop((left, top, right, bottom))
+        return np.asarray(region.convert('RGB'))
+
+    def close(self):
+        self._image.close()
+
+
+def open_image(image_path):
+    """以只读方式打开大图：.npy文件内存映射，其他格式通过ImageRegionReader按区域读取"""
+    if image_path.endswith('.npy'):
+        return np.load(image_path, mmap_mode='r')
+    return ImageRegionReader(image_path)
+
+
+def create_image(save_path, shape):
+    """创建可逐块写入的uint8 .npy内存映射文件"""
+    directory = os.path.dirname(save_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    return np.lib.format.open_memmap(save_path, mode='w+', dtype=np.uint8, shape=shape)
+
+
+def iter_tiles(height, width, tile_size, block_size=8):
+    """按行优先顺序产出tile范围(top, bottom, left, right)
+
+    tile边长向下取整为block_size的整数倍，保证tile边界与全图的块网格对齐。
+    """
+    step = max(block_size, tile_size // block_size * block_size)
+    for top in range(0, height, step):
+        for left in range(0, width, step):
+            yield top, min(top + step, height), left, min(left + step, width)
+
+
 def save_image(image, save_path):
     """保存图像（确保尺寸不变）"""
     try:
@@ -1,10 +1,10 @@
 import numpy as np
-from .dct_transform import dct_2d, idct_2d
-from .utils import text_to_binary, binary_to_text, normalize_image
+from .dct_transform import image_to_blocks, blockwise_dct, basis_pattern
+from .utils import text_to_binary, binary_to_text, normalize_image, iter_tiles
 
 
 class DCTWatermark:
-    def __init__(self, alpha=0.1, block_size=8, coeff_pos=(2, 2), q=10):
+    def __init__(self, alpha=0.1, block_size=8, coeff_pos=(2, 2), q=10, key=None):
         """
         初始化水印处理器
 
@@ -13,11 +13,14 @@ class DCTWatermark:
             block_size: DCT变换的块大小，通常为8x8
             coeff_pos: 用于嵌入水印的DCT系数位置(行,列)
             q: 量化步长
+            key: 可选的整数密钥；给定时水印比特按密钥伪随机地分散到全图的块中，
+                 否则按行优先顺序使用前面的块。提取时必须使用相同的密钥
         """
         self.alpha = alpha
         self.block_size = block_size
         self.coeff_pos = coeff_pos  # 选择中频系数位置
         self.q = q
+        self.key = key
 
         # 验证参数有效性
         if self.block_size <= 0:
@@ -27,6 +30,54 @@ class DCTWatermark:
         if self.coeff_pos[1] < 0 or self.coeff_pos[1] >= self.block_size:
             raise ValueError(f"系数列位置必须在0到{self.block_size - 1}之间")
 
+        # DCT是线性正交变换：系数(u, v)上的增量等价于空间域块上叠加的基函数图样
+        self._pattern = basis_pattern(self.block_size, *self.coeff_pos)
+
+    def _select_blocks(self, grid, count):
+        """在(块行数, 块列数)的完整块网格中选出承载水印比特的count个块，返回其(块行, 块列)索引
+
+        无密钥时按行优先顺序取前count个块；有密钥时由密钥决定的伪随机抽样（不放回）。
+        """
+        rows, cols = grid
+        if self.key is None:
+            indices = np.arange(count)
+        else:
+            indices = np.random.default_rng(self.key).choice(rows * cols, size=count, replace=False)
+        return np.divmod(indices, cols)
+
+    def _block_grid(self, image):
+        """图像完整块网格的(块行数, 块列数)，不完整的边缘块不计入"""
+        return image.shape[0] // self.block_size, image.shape[1] // self.block_size
+
+    def _watermark_bits(self, watermark_text, capacity):
+        """将水印文本转换为0/1比特数组，最多capacity位"""
+        watermark_bits = text_to_binary(watermark_text)
+        if not watermark_bits:
+            raise ValueError("水印文本不能为空")
+
+        watermark_length = len(watermark_bits)
+        bit_index = min(watermark_length, capacity)
+
+        # 如果水印没有完全嵌入，发出警告
+        if bit_index < watermark_length:
+            print(f"警告: 图像太小，只能嵌入{bit_index}位水印，原始水印长度为{watermark_length}位")
+        return np.frombuffer(watermark_bits[:bit_index].encode('ascii'), dtype=np.uint8) - ord('0')
+
+    def _tile_blocks(self, block_rows, block_cols, tile):
+        """选中块中落在tile内的掩码，以及这些块相对tile左上角的(块行, 块列)"""
+        top, bottom, left, right = tile
+        ys, xs = block_rows * self.block_size, block_cols * self.block_size
+        inside = (ys >= top) & (ys < bottom) & (xs >= left) & (xs < right)
+        return inside, block_rows[inside] - top // self.block_size, block_cols[inside] - left // self.block_size
+
+    def _add_pattern(self, gray_image, block_rows, block_cols, deltas):
+        """应用水印嵌入公式 D'(u,v) = D(u,v) + alpha*q*(bit-0.5)，原地修改灰度图
+
+        只修改承载比特的块，且在空间域叠加基函数图样，无需DCT/IDCT。
+        """
+        blocks = image_to_blocks(gray_image, self.block_size)
+        blocks[block_rows, block_cols] += deltas[:, None, None] * self._pattern
+
     def _preprocess_image(self, image, is_gray=False):
         """预处理图像：根据需要转换为灰度图"""
         if is_gray:
@@ -58,63 +109,22 @@ class DCTWatermark:
         original_shape = carrier_image.shape
         is_color = len(original_shape) == 3 and original_shape[-1] == 3
 
-        # 预处理为灰度图进行水印处理
-        gray_image = self._preprocess_image(carrier_image, is_gray=True)
-        height, width = gray_image.shape
-
-        # 将水印文本转换为二进制
-        watermark_bits = text_to_binary(watermark_text)
-        if not watermark_bits:
-            raise ValueError("水印文本不能为空")
-
-        watermark_length = len(watermark_bits)
-        bit_index = 0
+        # 预处理为灰度图进行水印处理（得到新数组，直接在其上修改）
+        watermarked_gray = self._preprocess_image(carrier_image, is_gray=True)
 
-        # 创建图像副本以避免修改原始图像
-        watermarked_gray = gray_image.copy()
-
-        # 遍历图像块并嵌入水印
-        for i in range(0, height, self.block_size):
-            for j in range(0, width, self.block_size):
-                # 计算块的结束坐标，处理边界情况
-                block_end_i = min(i + self.block_size, height)
-                block_end_j = min(j + self.block_size, width)
-
-                # 只有完整的块才用于嵌入水印
-                if block_end_i - i != self.block_size or block_end_j - j != self.block_size:
-                    continue
-
-                # 提取当前块并进行DCT变换
-                block = gray_image[i:block_end_i, j:block_end_j]
-                dct_block = dct_2d(block)
-
-                # 嵌入水印比特
-                if bit_index < watermark_length:
-                    bit = int(watermark_bits[bit_index])
-                    u, v = self.coeff_pos
-
-                    # 应用水印嵌入公式
-                    dct_block[u, v] += self.alpha * self.q * (bit - 0.5)
-                    bit_index += 1
-
-                # 逆DCT变换并将块放回图像
-                idct_block = idct_2d(dct_block)
-                watermarked_gray[i:block_end_i, j:block_end_j] = idct_block
-
-        # 如果水印没有完全嵌入，发出警告
-        if bit_index < watermark_length:
-            print(f"警告: 图像太小，只能嵌入{bit_index}位水印，原始水印长度为{watermark_length}位")
+        # 将水印文本转换为二进制，只有完整的块才用于嵌入水印
+        grid = self._block_grid(watermarked_gray)
+        bits = self._watermark_bits(watermark_text, grid[0] * grid[1])
+        block_rows, block_cols = self._select_blocks(grid, len(bits))
+        self._add_pattern(watermarked_gray, block_rows, block_cols, self.alpha * self.q * (bits - 0.5))
 
         # 归一化灰度图结果
         normalized_gray = normalize_image(watermarked_gray)
 
         # 恢复为原始图像的通道数
         if is_color:
-            # 将灰度图转换回3通道（复制灰度值到每个通道）
-            watermarked_image = np.stack([normalized_gray, normalized_gray, normalized_gray], axis=-1)
-            # 确保数据类型正确
-            watermarked_image = watermarked_image.astype(carrier_image.dtype)
-            return watermarked_image
+            # 将灰度图转换回3通道（广播灰度值到每个通道，只分配一次输出）
+            return np.broadcast_to(normalized_gray[:, :, None], original_shape).astype(carrier_image.dtype)
         else:
             return normalized_gray.astype(carrier_image.dtype)
 
@@ -140,42 +150,18 @@ class DCTWatermark:
         orig_gray = self._preprocess_image(original_image, is_gray=True)
         watermarked_gray = self._preprocess_image(watermarked_image, is_gray=True)
 
-        height, width = orig_gray.shape
         total_bits = watermark_length * 8  # 每个字符8位
-        extracted_bits = []
-
-        # 遍历图像块并提取水印
-        for i in range(0, height, self.block_size):
-            for j in range(0, width, self.block_size):
-                # 计算块的结束坐标
-                block_end_i = min(i + self.block_size, height)
-                block_end_j = min(j + self.block_size, width)
-
-                # 只处理完整的块
-                if block_end_i - i != self.block_size or block_end_j - j != self.block_size:
-                    continue
-
-                # 对原始图像块和含水印图像块进行DCT变换
-                orig_block = orig_gray[i:block_end_i, j:block_end_j]
-                watermarked_block = watermarked_gray[i:block_end_i, j:block_end_j]
 
-                orig_dct = dct_2d(orig_block)
-                watermarked_dct = dct_2d(watermarked_block)
+        # 只处理承载比特的完整块：系数差 = 块差与基函数图样的内积（DCT线性）
+        orig_blocks = image_to_blocks(orig_gray, self.block_size)
+        watermarked_blocks = image_to_blocks(watermarked_gray, self.block_size)
+        grid = self._block_grid(orig_gray)
+        block_rows, block_cols = self._select_blocks(grid, min(total_bits, grid[0] * grid[1]))
+        block_diff = watermarked_blocks[block_rows, block_cols] - orig_blocks[block_rows, block_cols]
+        diff = np.einsum('kij,ij->k', block_diff, self._pattern)
 
-                # 提取水印比特
-                if len(extracted_bits) < total_bits:
-                    u, v = self.coeff_pos
-                    diff = watermarked_dct[u, v] - orig_dct[u, v]
-
-                    # 根据差值判断水印比特
-                    extracted_bit = '1' if diff >= 0 else '0'
-                    extracted_bits.append(extracted_bit)
-
-                # 如果已提取足够的比特，提前退出
-                if len(extracted_bits) >= total_bits:
-                    break
-            if len(extracted_bits) >= total_bits:
-                break
+        # 根据差值判断水印比特
+        extracted_bits = np.where(diff >= 0, '1', '0')
 
         # 将二进制转换为文本并返回
         return binary_to_text(''.join(extracted_bits))
@@ -193,8 +179,102 @@ class DCTWatermark:
         """
         # 对于盲提取，我们假设原始DCT系数为0（简化实现）
         # 在实际应用中，应使用更复杂的统计方法估计原始系数
-        height, width = watermarked_image.shape[:2]
-        dummy_original = np.zeros((height, width), dtype=np.float32)
-        if len(watermarked_image.shape) == 3 and watermarked_image.shape[-1] == 3:
-            dummy_original = np.stack([dummy_original, dummy_original, dummy_original], axis=-1)
-        return self.extract(dummy_original, watermarked_image, watermark_length)
+        watermarked_gray = self._preprocess_image(watermarked_image, is_gray=True)
+        grid = self._block_grid(watermarked_gray)
+        block_rows, block_cols = self._select_blocks(grid, min(watermark_length * 8, grid[0] * grid[1]))
+
+        # 只对承载比特的块做一次批量DCT，无需构造全零的原始图像
+        blocks = image_to_blocks(watermarked_gray, self.block_size)
+        u, v = self.coeff_pos
+        coeffs = blockwise_dct(blocks[block_rows, block_cols])[:, u, v]
+
+        # 根据系数符号判断水印比特
+        extracted_bits = np.where(coeffs >= 0, '1', '0')
+        return binary_to_text(''.join(extracted_bits))
+
+    def embed_tiled(self, carrier_image, output, watermark_text, tile_size=1024):
+        """
+        按tile嵌入水印，适用于无法整体载入内存的超大图像
+
+        参数:
+            carrier_image: 支持二维切片读取的载体图像 (RGB或灰度图)，如utils.open_image返回的内存映射
+            output: 与载体图像形状相同的可写uint8数组，如utils.create_image创建的内存映射，结果逐tile写入
+            watermark_text: 要嵌入的文本水印
+            tile_size: tile边长（像素），向下取整为块大小的整数倍
+
+        返回:
+            output，内容与embed(carrier_image, watermark_text)一致
+        """
+        if carrier_image.shape != output.shape:
+            raise ValueError("载体图像和输出图像必须具有相同的尺寸")
+
+        height, width = carrier_image.shape[:2]
+        grid = self._block_grid(carrier_image)
+        bits = self._watermark_bits(watermark_text, grid[0] * grid[1])
+        block_rows, block_cols = self._select_blocks(grid, len(bits))
+        deltas = self.alpha * self.q * (bits - 0.5)
+        tiles = list(iter_tiles(height, width, tile_size, self.block_size))
+
+        def watermarked_tile(tile):
+            top, bottom, left, right = tile
+            gray = self._preprocess_image(carrier_image[top:bottom, left:right], is_gray=True)
+            inside, rows, cols = self._tile_blocks(block_rows, block_cols, tile)
+            self._add_pattern(gray, rows, cols, deltas[inside])
+            return gray
+
+        # 第一遍：归一化需要含水印灰度图的全局最小/最大值
+        img_min, img_max = np.inf, -np.inf
+        for tile in tiles:
+            gray = watermarked_tile(tile)
+            img_min, img_max = min(img_min, gray.min()), max(img_max, gray.max())
+
+        # 第二遍：重新计算每个tile（只有少数块被修改，重算比缓存整幅浮点图更省内存）并写出
+        for tile in tiles:
+            top, bottom, left, right = tile
+            normalized_gray = normalize_image(watermarked_tile(tile), (img_min, img_max))
+            if output.ndim == 3:
+                output[top:bottom, left:right] = normalized_gray[:, :, None]
+            else:
+                output[top:bottom, left:right] = normalized_gray
+
+        if isinstance(output, np.memmap):
+            output.flush()
+        return output
+
+    def extract_tiled(self, original_image, watermarked_image, watermark_length, tile_size=1024):
+        """
+        按tile提取水印，只读取包含承载比特的块的tile
+
+        参数:
+            original_image: 原始载体图像 (用于非盲提取)，支持二维切片读取
+            watermarked_image: 含水印的图像，支持二维切片读取
+            watermark_length: 原始水印文本的长度（字符数）
+            tile_size: tile边长（像素），向下取整为块大小的整数倍
+
+        返回:
+            提取的水印文本
+        """
+        if original_image.shape != watermarked_image.shape:
+            raise ValueError("原始图像和含水印图像必须具有相同的尺寸")
+
+        height, width = original_image.shape[:2]
+        grid = self._block_grid(original_image)
+        total_bits = min(watermark_length * 8, grid[0] * grid[1])
+        block_rows, block_cols = self._select_blocks(grid, total_bits)
+        diff = np.zeros(total_bits)
+
+        for tile in iter_tiles(height, width, tile_size, self.block_size):
+            inside, rows, cols = self._tile_blocks(block_rows, block_cols, tile)
+            if not inside.any():
+                continue
+            top, bottom, left, right = tile
+            orig_blocks = image_to_blocks(
+                self._preprocess_image(original_image[top:bottom, left:right], is_gray=True), self.block_size)
+            watermarked_blocks = image_to_blocks(
+                self._preprocess_image(watermarked_image[top:bottom, left:right], is_gray=True), self.block_size)
+            block_diff = watermarked_blocks[rows, cols] - orig_blocks[rows, cols]
+            diff[inside] = np.einsum('kij,ij->k', block_diff, self._pattern)
+
+        # 根据差值判断水印比特
+        extracted_bits = np.where(diff >= 0, '1', '0')
+        return binary_to_text(''.join(extracted_bits))
@@ -1,8 +1,15 @@
 import unittest
 import os
+import tempfile
 import numpy as np
+from PIL import Image
 from project_2_watermark.src.watermark import DCTWatermark
-from project_2_watermark.src.utils import text_to_binary, binary_to_text, psnr, ber
+from project_2_watermark.src.utils import (
+    text_to_binary, binary_to_text, psnr, ber, open_image, create_image, iter_tiles
+)
+from project_2_watermark.src.dct_transform import (
+    dct_2d, idct_2d, image_to_blocks, blockwise_dct, basis_pattern
+)
 
 
 class TestDCTWatermark(unittest.TestCase):
@@ -84,6 +91,23 @@ class TestDCTWatermark(unittest.TestCase):
         with self.assertRaises(ValueError):
             DCTWatermark(coeff_pos=(2, 10))  # 列位置超出范围
 
+    def test_keyed_embedding(self):
+        """测试带密钥的嵌入：比特分散到全图，只有相同密钥才能正确提取"""
+        watermarker = DCTWatermark(alpha=0.15, key=2024)
+        watermarked = watermarker.embed(self.gray_image, self.watermark_text)
+        self.assertEqual(watermarker.extract(self.gray_image, watermarked, len(self.watermark_text)),
+                         self.watermark_text)
+
+        # 无密钥时只有前len(bits)个块被修改，带密钥时修改的块分布到图像下半部分
+        background = np.bincount(watermarked.ravel()).argmax()
+        changed = np.any(image_to_blocks(watermarked != background, 8), axis=(2, 3))
+        self.assertEqual(changed.sum(), len(text_to_binary(self.watermark_text)))
+        self.assertTrue(changed[32:].any())
+
+        wrong_key = DCTWatermark(alpha=0.15, key=2025)
+        self.assertNotEqual(wrong_key.extract(self.gray_image, watermarked, len(self.watermark_text)),
+                            self.watermark_text)
+
     def test_blind_extraction(self):
         """测试盲提取功能（不使用原始图像）"""
         # 嵌入水印
@@ -101,5 +125,98 @@ class TestDCTWatermark(unittest.TestCase):
         self.assertLess(error_rate, 0.2)
 
 
+
+class TestBlockwiseDCT(unittest.TestCase):
+    """测试向量化的分块DCT"""
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        # 尺寸不是8的倍数，右侧和下侧的不完整块应被忽略
+        self.image = rng.uniform(0, 255, (37, 53)).astype(np.float32)
+
+    def test_blocks_view(self):
+        """测试块视图的形状与顺序"""
+        blocks = image_to_blocks(self.image, 8)
+        self.assertEqual(blocks.shape, (4, 6, 8, 8))
+        np.testing.assert_array_equal(blocks[1, 2], self.image[8:16, 16:24])
+
+    def test_matches_per_block_dct(self):
+        """测试批量DCT与逐块dct_2d结果一致"""
+        blocks = image_to_blocks(self.image, 8)
+        coeffs = blockwise_dct(blocks)
+        for i in range(blocks.shape[0]):
+            for j in range(blocks.shape[1]):
+                np.testing.assert_allclose(coeffs[i, j], dct_2d(blocks[i, j]), atol=1e-3)
+
+    def test_basis_pattern(self):
+        """测试基函数图样等于单位系数的逆DCT"""
+        coeffs = np.zeros((8, 8))
+        coeffs[2, 3] = 1.0
+        np.testing.assert_allclose(basis_pattern(8, 2, 3), idct_2d(coeffs), atol=1e-12)
+
+    def test_embed_extract_partial_blocks(self):
+        """测试尺寸不是块大小整数倍的图像"""
+        image = np.full((97, 113), 128, dtype=np.uint8)
+        image[40:, 40:] = 200
+        watermarker = DCTWatermark(alpha=0.15)
+        watermarked = watermarker.embed(image, "Hi!")
+        self.assertEqual(watermarked.shape, image.shape)
+        self.assertEqual(watermarker.extract(image, watermarked, 3), "Hi!")
+
+
+
+class TestTiledWatermark(unittest.TestCase):
+    """测试基于内存映射的分tile水印处理"""
+
+    def setUp(self):
+        rng = np.random.default_rng(1)
+        # 块内恒定的随机图像（AC系数为0，归一化不影响提取），尺寸不是tile和块大小的整数倍；
+        # 非均匀图像上uint8量化误差较大，使用较大的嵌入强度
+        levels = rng.integers(0, 256, (26, 20, 3), dtype=np.uint8)
+        self.image = levels.repeat(8, axis=0).repeat(8, axis=1)[:203, :157]
+        self.watermark_text = "Tiled watermark"
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.carrier_path = os.path.join(self.temp_dir.name, 'carrier.npy')
+        np.save(self.carrier_path, self.image)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_iter_tiles_block_aligned(self):
+        """测试tile与块网格对齐且完整覆盖图像"""
+        covered = np.zeros((203, 157), dtype=int)
+        for top, bottom, left, right in iter_tiles(203, 157, 50, 8):
+            self.assertEqual(top % 8, 0)
+            self.assertEqual(left % 8, 0)
+            covered[top:bottom, left:right] += 1
+        self.assertTrue(np.all(covered == 1))
+
+    def test_embed_tiled_matches_embed(self):
+        """测试分tile嵌入与整图嵌入结果一致，并可分tile提取"""
+        for key in (None, 42):
+            watermarker = DCTWatermark(alpha=1.0, key=key)
+            output_path = os.path.join(self.temp_dir.name, f'watermarked_{key}.npy')
+            output = watermarker.embed_tiled(open_image(self.carrier_path), create_image(output_path, self.image.shape),
+                                             self.watermark_text, tile_size=64)
+            del output
+
+            watermarked = open_image(output_path)
+            np.testing.assert_array_equal(watermarked, watermarker.embed(self.image, self.watermark_text))
+            extracted = watermarker.extract_tiled(open_image(self.carrier_path), watermarked,
+                                                  len(self.watermark_text), tile_size=64)
+            self.assertEqual(extracted, self.watermark_text)
+
+    def test_region_reader(self):
+        """测试通过PIL按区域读取图像文件"""
+        png_path = os.path.join(self.temp_dir.name, 'carrier.png')
+        Image.fromarray(self.image).save(png_path)
+        reader = open_image(png_path)
+        try:
+            self.assertEqual(reader.shape, self.image.shape)
+            np.testing.assert_array_equal(reader[16:80, 40:157], self.image[16:80, 40:157])
+        finally:
+            reader.close()
+
+
 if __name__ == '__main__':
     unittest.main()
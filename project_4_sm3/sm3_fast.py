@@ -0,0 +1,56 @@
+import hashlib
+import time
+from sm3_optimized import SM3
+
+# 标准测试向量：SM3("abc")
+_TEST_VECTOR = (b"abc", "66c7f0f462eeedd9d1f2d46bdc10e4e24167c4875cf2f7a2297da02b8f4ba8e0")
+
+
+def _hashlib_new(data=b''):
+    return hashlib.new('sm3', data)
+
+
+def _load_hashlib():
+    hashlib.new('sm3')  # OpenSSL未提供SM3时抛出ValueError
+    return _hashlib_new
+
+
+def _select_backend():
+    """优先OpenSSL(hashlib)，否则使用纯Python实现；只采用通过测试向量的后端
+
+    new()的返回值必须支持增量update/copy（SM2流式加解密的C3累加依赖常量内存），
+    sm3_ext.so只提供一次性哈希，因此不作为后端。
+    """
+    try:
+        factory = _load_hashlib()
+    except ValueError:
+        return "python", SM3
+    if factory(_TEST_VECTOR[0]).hexdigest() == _TEST_VECTOR[1]:
+        return "hashlib", factory
+    return "python", SM3
+
+
+BACKEND, new = _select_backend()
+
+
+def sm3_digest(data):
+    """计算SM3摘要，返回32字节"""
+    return new(data).digest()
+
+
+def sm3_hash(data):
+    """计算SM3摘要，返回十六进制字符串（与sm3_optimized.sm3_hash接口一致）"""
+    if isinstance(data, str):
+        data = data.encode()
+    return new(data).hexdigest()
+
+
+# 性能测试
+if __name__ == "__main__":
+    print(f"当前后端: {BACKEND}")
+    data = b'a' * (1024 * 1024)
+    for name, factory in [("当前后端", new), ("纯Python", SM3)]:
+        start = time.perf_counter()
+        digest = factory(data[:64 * 1024]).hexdigest()
+        elapsed = time.perf_counter() - start
+        print(f"{name}: 64KB耗时{elapsed * 1000:.2f}ms, 吞吐量{0.0625 / elapsed:.2f}MB/s, 摘要{digest[:16]}...")
@@ -0,0 +1,99 @@
+from sm3_rfc6962_merkle_tree import RFC6962MerkleTree
+import random
+import time
+from typing import List, Optional
+
+
+class MerkleLog(RFC6962MerkleTree):
+    """仅追加的Merkle日志（透明日志场景）
+
+    tree[h][i] 缓存完美子树 D[i*2^h : (i+1)*2^h] 的哈希，只在子树填满时写入一次，
+    之后永不改变；各层最后一个“落单”的节点构成右边界（frontier）。
+    追加一个叶子最多合并 O(log n) 个节点，根哈希由右边界折叠得到；
+    历史树头、存在性证明和一致性证明直接复用RFC6962MerkleTree的实现。
+    """
+
+    def __init__(self, leaves: Optional[List[bytes]] = None):
+        super().__init__(list(leaves) if leaves else [])
+
+    def __len__(self) -> int:
+        return self.leaf_count
+
+    @property
+    def size(self) -> int:
+        return self.leaf_count
+
+    def append(self, leaf: bytes) -> int:
+        """追加单个叶子，返回其索引"""
+        index = self.leaf_count
+        self.leaves.append(leaf)
+        self.leaf_count += 1
+
+        # 向上合并新填满的完美子树
+        level = 0
+        node_hash = self._hash_leaf(leaf)
+        self._leaf_index.setdefault(node_hash, index)
+        while True:
+            if level == len(self.tree):
+                self.tree.append([])
+            nodes = self.tree[level]
+            nodes.append(node_hash)
+            if len(nodes) % 2 == 1:
+                break
+            node_hash = self._hash_internal(nodes[-2], nodes[-1])
+            level += 1
+
+        self._root_cache = None
+        return index
+
+    def extend(self, leaves: List[bytes]) -> range:
+        """批量追加叶子，逐层只计算新填满的子树，返回新叶子的索引范围"""
+        start = self.leaf_count
+        self.leaves.extend(leaves)
+        self.leaf_count = len(self.leaves)
+        leaf_hashes = [self._hash_leaf(leaf) for leaf in leaves]
+        self._index_leaves(start, leaf_hashes)
+        self._extend_levels(leaf_hashes)
+        return range(start, self.leaf_count)
+
+
+# 测试代码
+def test_merkle_log():
+    num_leaves = 10000
+    print(f"生成{num_leaves}个叶子节点...")
+    leaves = [bytes(random.getrandbits(8) for _ in range(32)) for _ in range(num_leaves)]
+
+    log = MerkleLog()
+    start = time.time()
+    for leaf in leaves:
+        log.append(leaf)
+    append_time = time.time() - start
+    print(f"逐个追加耗时: {append_time:.3f}秒（平均{append_time / num_leaves * 1e6:.1f}微秒/条）")
+
+    start = time.time()
+    batch_log = MerkleLog(leaves)
+    print(f"批量追加耗时: {time.time() - start:.3f}秒")
+    print(f"根哈希一致: {log.root == batch_log.root}, 根哈希: {log.root[:16]}...\n")
+
+    # 对旧条目生成存在性证明
+    test_idx = random.randint(0, num_leaves // 2)
+    proof = log.get_inclusion_proof(test_idx)
+    inc_result = RFC6962MerkleTree.verify_inclusion(leaves[test_idx], proof, log.root, test_idx, num_leaves)
+    print(f"存在性证明测试（索引{test_idx}，路径长度{len(proof)}）: {'成功' if inc_result else '失败'}")
+
+    # 历史树头上的存在性证明与一致性证明
+    old_size = num_leaves // 3
+    old_proof = log.get_inclusion_proof(test_idx % old_size, old_size)
+    old_result = RFC6962MerkleTree.verify_inclusion(
+        leaves[test_idx % old_size], old_proof, log.get_root(old_size), test_idx % old_size, old_size
+    )
+    print(f"历史树头（大小{old_size}）存在性证明测试: {'成功' if old_result else '失败'}")
+    consistency_proof = log.get_consistency_proof(old_size)
+    con_result = RFC6962MerkleTree.verify_consistency(
+        old_size, num_leaves, log.get_root(old_size), log.root, consistency_proof
+    )
+    print(f"一致性证明测试（{old_size} -> {num_leaves}）: {'成功' if con_result else '失败'}")
+
+
+if __name__ == "__main__":
+    test_merkle_log()
@@ -146,6 +146,53 @@ def sm3_hash(message):
     return ''.join(f'{word:08x}' for word in V)
 
 
+class SM3:
+    """增量式SM3（字节接口），支持update/copy，可克隆中间状态复用公共前缀"""
+
+    digest_size = 32
+    block_size = 64
+
+    def __init__(self, data=b''):
+        self._state = IV.copy()
+        self._buffer = b''
+        self._length = 0
+        if data:
+            self.update(data)
+
+    def update(self, data):
+        if isinstance(data, str):
+            data = data.encode()
+        self._length += len(data)
+        buffer = self._buffer + bytes(data)
+        full = len(buffer) - len(buffer) % 64
+        V = self._state
+        for i in range(0, full, 64):
+            V = compression_function(V, buffer[i:i + 64])
+        self._state = V
+        self._buffer = buffer[full:]
+
+    def copy(self):
+        clone = SM3.__new__(SM3)
+        clone._state = self._state.copy()
+        clone._buffer = self._buffer
+        clone._length = self._length
+        return clone
+
+    def digest(self):
+        # 对剩余数据按总长度填充（不修改当前状态，之后仍可继续update）
+        tail = bytearray(self._buffer)
+        tail.append(0x80)
+        tail.extend(b'\x00' * ((56 - len(tail)) % 64))
+        tail.extend(struct.pack('>Q', self._length * 8))
+        V = self._state
+        for i in range(0, len(tail), 64):
+            V = compression_function(V, tail[i:i + 64])
+        return struct.pack('>8I', *V)
+
+    def hexdigest(self):
+        return self.digest().hex()
+
+
 # 性能测试
 def test_performance():
     test_sizes = [1024, 1024 * 10, 1024 * 100, 1024 * 1024]  # 1KB, 10KB, 100KB, 1MB
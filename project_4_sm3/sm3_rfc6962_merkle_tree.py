@@ -1,14 +1,40 @@
 from sm3_optimized import sm3_hash
+from bisect import bisect_left
 import random
+import time
 from typing import List, Tuple, Optional, Dict
 
 
+def _split_point(n: int) -> int:
+    """RFC6962分割点：小于n的最大2的幂（n > 1）"""
+    return 1 << ((n - 1).bit_length() - 1)
+
+
+def _inclusion_ranges(index: int, tree_size: int) -> List[Tuple[Tuple[int, int], bool]]:
+    """自顶向下列出叶子index路径上的内部节点区间，以及兄弟子树是否在右侧"""
+    ranges = []
+    start, end = 0, tree_size
+    while end - start > 1:
+        k = _split_point(end - start)
+        sibling_is_right = index < start + k
+        ranges.append(((start, end), sibling_is_right))
+        if sibling_is_right:
+            end = start + k
+        else:
+            start = start + k
+    return ranges
+
+
 class RFC6962MerkleTree:
-    """基于RFC6962标准的Merkle树实现（精简输出版）"""
+    """基于RFC6962标准的Merkle树实现（精简输出版）
 
-    def __init__(self, leaves: List[bytes]):
+    sorted_leaves=True 时叶子按叶哈希排序（排序Merkle模式），此时可生成不存在性证明。
+    """
+
+    def __init__(self, leaves: List[bytes], sorted_leaves: bool = False):
         self.leaves = leaves
         self.leaf_count = len(leaves)
+        self.sorted_leaves = sorted_leaves
         self.tree = []
         self._build_tree()
 
@@ -23,83 +49,301 @@ class RFC6962MerkleTree:
         return sm3_hash(b'\x01' + left_bytes + right_bytes)
 
     def _build_tree(self) -> None:
-        # 计算叶子层哈希
+        # tree[h][i] 为完美子树 D[i*2^h : (i+1)*2^h] 的哈希，非完美的右边界子树按需计算
+        self._root_cache: Optional[Tuple[int, str]] = None
+        self._leaf_index: Dict[str, int] = {}
         leaf_hashes = [self._hash_leaf(leaf) for leaf in self.leaves]
-        self.tree.append(leaf_hashes)
-
-        # 逐层计算内部节点
-        current_level = leaf_hashes
-        while len(current_level) > 1:
-            next_level = []
-            i = 0
-            while i < len(current_level):
-                left = current_level[i]
-                if i + 1 < len(current_level):
-                    right = current_level[i + 1]
-                    i += 2
-                else:
-                    right = left
-                    i += 1
-                next_level.append(self._hash_internal(left, right))
-            current_level = next_level
-            self.tree.append(current_level)
+        if self.sorted_leaves:
+            order = sorted(range(self.leaf_count), key=leaf_hashes.__getitem__)
+            self.leaves = [self.leaves[i] for i in order]
+            leaf_hashes = [leaf_hashes[i] for i in order]
+        self._index_leaves(0, leaf_hashes)
+        self._extend_levels(leaf_hashes)
+
+    def _index_leaves(self, start: int, leaf_hashes: List[str]) -> None:
+        """登记叶哈希到索引的映射（重复叶子保留第一次出现的位置）"""
+        for idx, h in enumerate(leaf_hashes, start):
+            self._leaf_index.setdefault(h, idx)
+
+    def _extend_levels(self, new_nodes: List[str]) -> None:
+        """将新叶子哈希并入各层，逐层只计算新填满的完美子树"""
+        level = 0
+        while new_nodes:
+            if level == len(self.tree):
+                self.tree.append([])
+            nodes = self.tree[level]
+            old_len = len(nodes)
+            nodes.extend(new_nodes)
+            # 旧长度为奇数时，落单节点与第一个新节点配对
+            new_nodes = [
+                self._hash_internal(nodes[i], nodes[i + 1])
+                for i in range(old_len - old_len % 2, len(nodes) - 1, 2)
+            ]
+            level += 1
+        self._root_cache = None
+
+    def subtree_hash(self, start: int, end: int) -> str:
+        """计算MTH(D[start:end])：完美对齐子树直接读缓存，否则按RFC6962的2^k分割递归"""
+        width = end - start
+        if width & (width - 1) == 0 and start % width == 0:
+            level = width.bit_length() - 1
+            return self.tree[level][start >> level]
+        k = _split_point(width)
+        return self._hash_internal(
+            self.subtree_hash(start, start + k),
+            self.subtree_hash(start + k, end)
+        )
+
+    def get_root(self, tree_size: Optional[int] = None) -> str:
+        """返回前tree_size个叶子的根哈希MTH(D[0:tree_size])（默认为整棵树）"""
+        if tree_size is None:
+            tree_size = self.leaf_count
+        if tree_size < 0 or tree_size > self.leaf_count:
+            raise ValueError(f"树大小必须在0到{self.leaf_count}之间")
+        if tree_size == 0:
+            return sm3_hash(b'')
+        if self._root_cache is not None and self._root_cache[0] == tree_size:
+            return self._root_cache[1]
+        root = self.subtree_hash(0, tree_size)
+        if tree_size == self.leaf_count:
+            self._root_cache = (tree_size, root)
+        return root
 
     @property
     def root(self) -> str:
-        return self.tree[-1][0] if self.tree else ""
+        return self.get_root()
 
     def get_leaf_index(self, leaf_data: bytes) -> Optional[int]:
-        target_hash = self._hash_leaf(leaf_data)
-        for idx, h in enumerate(self.tree[0]):
-            if h == target_hash:
-                return idx
-        return None
-
-    def get_inclusion_proof(self, index: int) -> List[Tuple[str, bool]]:
-        if index < 0 or index >= self.leaf_count:
+        return self._leaf_index.get(self._hash_leaf(leaf_data))
+
+    def get_inclusion_proof(self, index: int, tree_size: Optional[int] = None) -> List[str]:
+        """生成RFC6962审计路径PATH(index, D[0:tree_size])，自底向上排列
+
+        每层兄弟节点都是RFC分割下的子树，除右边界的一个外均为缓存的完美子树，共O(log n)次查表。
+        """
+        if tree_size is None:
+            tree_size = self.leaf_count
+        if tree_size > self.leaf_count or index < 0 or index >= tree_size:
             return []
 
         proof = []
-        current_idx = index
-        for level in range(len(self.tree) - 1):
-            current_level = self.tree[level]
-            total_nodes = len(current_level)
-
-            is_left = (current_idx % 2 == 0)
-            if is_left:
-                sibling_idx = current_idx + 1 if current_idx + 1 < total_nodes else current_idx
+        for (start, end), sibling_is_right in _inclusion_ranges(index, tree_size):
+            k = _split_point(end - start)
+            if sibling_is_right:
+                proof.append(self.subtree_hash(start + k, end))
             else:
-                sibling_idx = current_idx - 1
-
-            sibling_hash = current_level[sibling_idx]
-            proof.append((sibling_hash, is_left))
-            current_idx = current_idx // 2
-
+                proof.append(self.subtree_hash(start, start + k))
+        proof.reverse()
         return proof
 
     @staticmethod
     def verify_inclusion(
             leaf_data: bytes,
-            proof: List[Tuple[str, bool]],
+            proof: List[str],
             root: str,
             index: int,
             total_leaves: int
     ) -> bool:
+        """按index和total_leaves确定每层左右关系与路径长度后验证审计路径"""
+        if index < 0 or index >= total_leaves:
+            return False
+        ranges = _inclusion_ranges(index, total_leaves)
+        if len(proof) != len(ranges):
+            return False
+
         current_hash = RFC6962MerkleTree._hash_leaf(leaf_data)
-        for sibling_hash, is_left in proof:
-            if is_left:
+        for sibling_hash, (_, sibling_is_right) in zip(proof, reversed(ranges)):
+            if sibling_is_right:
                 current_hash = RFC6962MerkleTree._hash_internal(current_hash, sibling_hash)
             else:
                 current_hash = RFC6962MerkleTree._hash_internal(sibling_hash, current_hash)
         return current_hash == root
 
+    @staticmethod
+    def verify_inclusion_batch(
+            items: List[Tuple[bytes, List[str], int]],
+            root: str,
+            total_leaves: int
+    ) -> List[bool]:
+        """针对同一签名树头批量验证(leaf_data, proof, index)
+
+        已验证路径上的内部节点按区间记录下来，后续证明一旦汇入已验证节点即可停止哈希，
+        审计大量叶子时上层节点只需计算一次。
+        """
+        verified: Dict[Tuple[int, int], str] = {(0, total_leaves): root}
+        results = []
+        for leaf_data, proof, index in items:
+            if index < 0 or index >= total_leaves:
+                results.append(False)
+                continue
+            ranges = _inclusion_ranges(index, total_leaves)
+            if len(proof) != len(ranges):
+                results.append(False)
+                continue
+
+            current_hash = RFC6962MerkleTree._hash_leaf(leaf_data)
+            node_range = (index, index + 1)
+            computed = []
+            ok = False
+            for sibling_hash, ((start, end), sibling_is_right) in zip(proof, reversed(ranges)):
+                known = verified.get(node_range)
+                if known is not None:
+                    ok = known == current_hash
+                    break
+                computed.append((node_range, current_hash))
+                if sibling_is_right:
+                    current_hash = RFC6962MerkleTree._hash_internal(current_hash, sibling_hash)
+                else:
+                    current_hash = RFC6962MerkleTree._hash_internal(sibling_hash, current_hash)
+                node_range = (start, end)
+            else:
+                ok = current_hash == root
+
+            if ok:
+                verified.update(computed)
+            results.append(ok)
+        return results
+
+    def get_multi_proof(self, indices: List[int], tree_size: Optional[int] = None) -> List[str]:
+        """为一组叶子生成多重存在性证明（批量审计路径）
+
+        沿RFC分割自顶向下遍历，只有不含任何目标叶子的子树才作为证明节点输出，
+        多条路径共享的兄弟节点只出现一次。证明节点按从左到右的深度优先顺序排列。
+        """
+        if tree_size is None:
+            tree_size = self.leaf_count
+        indices = sorted(set(indices))
+        if not indices or tree_size > self.leaf_count or indices[0] < 0 or indices[-1] >= tree_size:
+            return []
+
+        proof = []
+
+        def collect(start: int, end: int, lo: int, hi: int) -> None:
+            # indices[lo:hi] 为落在 [start, end) 内的目标叶子
+            if lo == hi:
+                proof.append(self.subtree_hash(start, end))
+                return
+            if end - start == 1:
+                return
+            mid = start + _split_point(end - start)
+            split = bisect_left(indices, mid, lo, hi)
+            collect(start, mid, lo, split)
+            collect(mid, end, split, hi)
+
+        collect(0, tree_size, 0, len(indices))
+        return proof
+
+    @staticmethod
+    def verify_multi_proof(
+            leaf_items: List[Tuple[int, bytes]],
+            proof: List[str],
+            root: str,
+            total_leaves: int
+    ) -> bool:
+        """验证多重存在性证明，leaf_items为(index, leaf_data)列表
+
+        一次遍历重建根：每个内部节点只哈希一次，证明节点必须恰好用完。
+        """
+        leaf_map: Dict[int, bytes] = {}
+        for index, leaf_data in leaf_items:
+            if index < 0 or index >= total_leaves or leaf_map.setdefault(index, leaf_data) != leaf_data:
+                return False
+        if not leaf_map:
+            return False
+        indices = sorted(leaf_map)
+        proof_iter = iter(proof)
+
+        def fold(start: int, end: int, lo: int, hi: int) -> Optional[str]:
+            if lo == hi:
+                return next(proof_iter, None)
+            if end - start == 1:
+                return RFC6962MerkleTree._hash_leaf(leaf_map[indices[lo]])
+            mid = start + _split_point(end - start)
+            split = bisect_left(indices, mid, lo, hi)
+            left = fold(start, mid, lo, split)
+            right = fold(mid, end, split, hi)
+            if left is None or right is None:
+                return None
+            return RFC6962MerkleTree._hash_internal(left, right)
+
+        computed_root = fold(0, total_leaves, 0, len(indices))
+        return computed_root == root and next(proof_iter, None) is None
+
+    def get_consistency_proof(self, first_size: int, second_size: Optional[int] = None) -> List[str]:
+        """生成RFC6962一致性证明PROOF(first_size, D[0:second_size])"""
+        if second_size is None:
+            second_size = self.leaf_count
+        if second_size > self.leaf_count or first_size <= 0 or first_size > second_size:
+            return []
+
+        proof = []
+        start, end = 0, second_size
+        first_end = first_size
+        complete = True
+        # SUBPROOF(m, D[start:end], b) 的迭代展开，先收集的兄弟更靠近根
+        while first_end != end:
+            k = _split_point(end - start)
+            if first_end - start <= k:
+                proof.append(self.subtree_hash(start + k, end))
+                end = start + k
+            else:
+                proof.append(self.subtree_hash(start, start + k))
+                start = start + k
+                complete = False
+        if not complete:
+            proof.append(self.subtree_hash(start, end))
+        proof.reverse()
+        return proof
+
+    @staticmethod
+    def verify_consistency(
+            first_size: int,
+            second_size: int,
+            first_root: str,
+            second_root: str,
+            proof: List[str]
+    ) -> bool:
+        """按RFC 9162 2.1.4.2验证一致性证明"""
+        if first_size <= 0 or first_size > second_size:
+            return False
+        if first_size == second_size:
+            return not proof and first_root == second_root
+        if not proof:
+            return False
+
+        if first_size & (first_size - 1) == 0:
+            proof = [first_root] + proof
+        fn = first_size - 1
+        sn = second_size - 1
+        while fn & 1:
+            fn >>= 1
+            sn >>= 1
+
+        fr = sr = proof[0]
+        for c in proof[1:]:
+            if sn == 0:
+                return False
+            if fn & 1 or fn == sn:
+                fr = RFC6962MerkleTree._hash_internal(c, fr)
+                sr = RFC6962MerkleTree._hash_internal(c, sr)
+                while not fn & 1 and fn != 0:
+                    fn >>= 1
+                    sn >>= 1
+            else:
+                sr = RFC6962MerkleTree._hash_internal(sr, c)
+            fn >>= 1
+            sn >>= 1
+
+        return fr == first_root and sr == second_root and sn == 0
+
     def get_exclusion_proof(self, target_data: bytes) -> Dict[str, any]:
+        if not self.sorted_leaves:
+            raise ValueError("不存在性证明要求叶子按哈希排序，请使用sorted_leaves=True构建")
         target_hash = self._hash_leaf(target_data)
-        leaf_hashes = self.tree[0]
+        leaf_hashes = self.tree[0] if self.tree else []
 
-        insert_pos = 0
-        while insert_pos < self.leaf_count and leaf_hashes[insert_pos] < target_hash:
-            insert_pos += 1
+        # 叶子已按哈希有序，二分查找插入位置
+        insert_pos = bisect_left(leaf_hashes, target_hash)
 
         left_idx = insert_pos - 1 if insert_pos > 0 else None
         right_idx = insert_pos if insert_pos < self.leaf_count else None
@@ -127,23 +371,25 @@ class RFC6962MerkleTree:
 
     @staticmethod
     def verify_exclusion(proof: Dict[str, any]) -> bool:
-        # 验证左邻居
+        # 验证左邻居（哈希需与叶子数据一致，否则顺序检查无意义）
         left_valid = True
         left = proof["left"]
         if left["index"] is not None:
             left_data = proof["leaf_data_map"][left["index"]]
-            left_valid = RFC6962MerkleTree.verify_inclusion(
-                left_data, left["proof"], proof["root"], left["index"], proof["total_leaves"]
-            )
+            left_valid = RFC6962MerkleTree._hash_leaf(left_data) == left["hash"] and \
+                RFC6962MerkleTree.verify_inclusion(
+                    left_data, left["proof"], proof["root"], left["index"], proof["total_leaves"]
+                )
 
         # 验证右邻居
         right_valid = True
         right = proof["right"]
         if right["index"] is not None:
             right_data = proof["leaf_data_map"][right["index"]]
-            right_valid = RFC6962MerkleTree.verify_inclusion(
-                right_data, right["proof"], proof["root"], right["index"], proof["total_leaves"]
-            )
+            right_valid = RFC6962MerkleTree._hash_leaf(right_data) == right["hash"] and \
+                RFC6962MerkleTree.verify_inclusion(
+                    right_data, right["proof"], proof["root"], right["index"], proof["total_leaves"]
+                )
 
         # 验证哈希顺序和相邻性
         target_hash = proof["target_hash"]
@@ -153,10 +399,16 @@ class RFC6962MerkleTree:
         if right["hash"] and right["hash"] <= target_hash:
             order_valid = False
 
-        adjacent_valid = True
+        # 相邻性：缺少一侧邻居时，另一侧必须是首/尾叶子
+        total = proof["total_leaves"]
         if left["index"] is not None and right["index"] is not None:
-            if right["index"] - left["index"] != 1:
-                adjacent_valid = False
+            adjacent_valid = right["index"] - left["index"] == 1
+        elif left["index"] is not None:
+            adjacent_valid = left["index"] == total - 1
+        elif right["index"] is not None:
+            adjacent_valid = right["index"] == 0
+        else:
+            adjacent_valid = total == 0
 
         return left_valid and right_valid and order_valid and adjacent_valid
 
@@ -167,8 +419,9 @@ def test_merkle_tree():
     num_leaves = 100000
     leaves = [bytes(random.getrandbits(8) for _ in range(32)) for _ in range(num_leaves)]
 
-    print("构建Merkle树...")
-    merkle_tree = RFC6962MerkleTree(leaves)
+    print("构建Merkle树（按叶哈希排序）...")
+    merkle_tree = RFC6962MerkleTree(leaves, sorted_leaves=True)
+    leaves = merkle_tree.leaves
     print(f"树深度: {len(merkle_tree.tree)}, 根哈希: {merkle_tree.root[:16]}...\n")
 
     # 存在性证明测试
@@ -181,6 +434,44 @@ def test_merkle_tree():
     )
     print(f"存在性验证结果: {'成功' if inc_result else '失败'}\n")
 
+    # 批量存在性验证（同一树头）
+    batch_indices = random.sample(range(num_leaves), 200)
+    batch_items = [(leaves[i], merkle_tree.get_inclusion_proof(i), i) for i in batch_indices]
+    batch_results = RFC6962MerkleTree.verify_inclusion_batch(batch_items, merkle_tree.root, num_leaves)
+    print(f"批量存在性验证（{len(batch_items)}条）: {'成功' if all(batch_results) else '失败'}\n")
+
+    # 多重存在性证明：与逐条证明对比证明大小和验证耗时
+    individual_size = sum(len(proof) for _, proof, _ in batch_items)
+    start = time.time()
+    individual_results = [
+        RFC6962MerkleTree.verify_inclusion(leaf, proof, merkle_tree.root, i, num_leaves)
+        for leaf, proof, i in batch_items
+    ]
+    individual_time = time.time() - start
+
+    multi_proof = merkle_tree.get_multi_proof(batch_indices)
+    start = time.time()
+    multi_result = RFC6962MerkleTree.verify_multi_proof(
+        [(i, leaves[i]) for i in batch_indices], multi_proof, merkle_tree.root, num_leaves
+    )
+    multi_time = time.time() - start
+    print(f"多重存在性证明测试（{len(batch_indices)}条）: {'成功' if multi_result and all(individual_results) else '失败'}")
+    print(f"证明大小: 逐条{individual_size}个哈希, 多重{len(multi_proof)}个哈希 "
+          f"({len(multi_proof) / individual_size:.1%})")
+    print(f"验证耗时: 逐条{individual_time:.4f}秒, 多重{multi_time:.4f}秒\n")
+
+    # 一致性证明测试
+    old_size = random.randint(1, num_leaves - 1)
+    consistency_proof = merkle_tree.get_consistency_proof(old_size)
+    print(f"一致性证明测试（{old_size} -> {num_leaves}，证明长度{len(consistency_proof)}）:")
+    con_result = RFC6962MerkleTree.verify_consistency(
+        old_size, num_leaves, merkle_tree.get_root(old_size), merkle_tree.root, consistency_proof
+    )
+    print(f"一致性验证结果: {'成功' if con_result else '失败'}\n")
+
+    # 按数据查找叶子索引（哈希索引，O(1)）
+    print(f"叶子索引查找: {'成功' if merkle_tree.get_leaf_index(test_leaf) == test_idx else '失败'}\n")
+
     # 不存在性证明测试
     non_existent_leaf = b"exclusion_test_123456"
     exclusion_proof = merkle_tree.get_exclusion_proof(non_existent_leaf)
@@ -0,0 +1,160 @@
+from sm3_rfc6962_merkle_tree import RFC6962MerkleTree
+from sm3_optimized import sm3_hash
+import random
+import time
+from typing import List, Tuple, Optional, Dict, Iterable
+
+DEPTH = 256
+
+
+def _compute_default_hashes() -> List[str]:
+    """预计算各高度空子树的哈希：defaults[h] 为高度h的全空子树"""
+    defaults = [sm3_hash(b'')]
+    for _ in range(DEPTH):
+        defaults.append(RFC6962MerkleTree._hash_internal(defaults[-1], defaults[-1]))
+    return defaults
+
+
+DEFAULT_HASHES = _compute_default_hashes()
+
+
+class SparseMerkleTree:
+    """基于SM3的256层稀疏Merkle树，用于键值映射承诺
+
+    键的路径为SM3(key)的256个比特（高位在根附近）。nodes以(高度, 路径前缀)为键，
+    只缓存非空子树的哈希，空子树一律取预计算的DEFAULT_HASHES。
+    """
+
+    def __init__(self, items: Optional[Dict[bytes, bytes]] = None):
+        self.nodes: Dict[Tuple[int, int], str] = {}
+        self.values: Dict[int, bytes] = {}
+        if items:
+            self.update_batch(items.items())
+
+    @staticmethod
+    def key_path(key: bytes) -> int:
+        return int(sm3_hash(key), 16)
+
+    def _node(self, height: int, prefix: int) -> str:
+        return self.nodes.get((height, prefix), DEFAULT_HASHES[height])
+
+    @property
+    def root(self) -> str:
+        return self._node(DEPTH, 0)
+
+    def get(self, key: bytes) -> Optional[bytes]:
+        return self.values.get(self.key_path(key))
+
+    def update(self, key: bytes, value: Optional[bytes]) -> str:
+        """写入单个键值（value为None表示删除），返回新根哈希"""
+        return self.update_batch([(key, value)])
+
+    def update_batch(self, items: Iterable[Tuple[bytes, Optional[bytes]]]) -> str:
+        """批量写入键值，逐层只重算受影响的节点，多个键共享的祖先只哈希一次"""
+        dirty = set()
+        for key, value in items:
+            path = self.key_path(key)
+            if value is None:
+                self.values.pop(path, None)
+                self.nodes.pop((0, path), None)
+            else:
+                self.values[path] = value
+                self.nodes[(0, path)] = RFC6962MerkleTree._hash_leaf(value)
+            dirty.add(path)
+
+        for height in range(DEPTH):
+            default = DEFAULT_HASHES[height]
+            parents = {prefix >> 1 for prefix in dirty}
+            for parent in parents:
+                left = self.nodes.get((height, parent << 1), default)
+                right = self.nodes.get((height, (parent << 1) | 1), default)
+                if left == default and right == default:
+                    self.nodes.pop((height + 1, parent), None)
+                else:
+                    self.nodes[(height + 1, parent)] = RFC6962MerkleTree._hash_internal(left, right)
+            dirty = parents
+
+        return self.root
+
+    def get_proof(self, key: bytes) -> Dict[str, any]:
+        """生成压缩证明：bitmap第h位表示高度h的兄弟非空，siblings只包含这些非空兄弟（自底向上）
+
+        同一证明既可证明存在（value非空），也可证明不存在（value为None）。
+        """
+        path = self.key_path(key)
+        bitmap = 0
+        siblings = []
+        for height in range(DEPTH):
+            sibling = self.nodes.get((height, (path >> height) ^ 1))
+            if sibling is not None:
+                bitmap |= 1 << height
+                siblings.append(sibling)
+        return {
+            "key": key,
+            "value": self.values.get(path),
+            "bitmap": bitmap,
+            "siblings": siblings,
+            "root": self.root
+        }
+
+    @staticmethod
+    def verify_proof(proof: Dict[str, any]) -> bool:
+        """验证压缩证明，空兄弟取默认哈希，两侧均为空时直接取上一层默认值而不哈希"""
+        path = SparseMerkleTree.key_path(proof["key"])
+        value = proof["value"]
+        bitmap = proof["bitmap"]
+        siblings = proof["siblings"]
+        if bin(bitmap).count("1") != len(siblings):
+            return False
+
+        current = RFC6962MerkleTree._hash_leaf(value) if value is not None else DEFAULT_HASHES[0]
+        sibling_iter = iter(siblings)
+        for height in range(DEPTH):
+            default = DEFAULT_HASHES[height]
+            sibling = next(sibling_iter) if bitmap >> height & 1 else default
+            if current == default and sibling == default:
+                current = DEFAULT_HASHES[height + 1]
+            elif (path >> height) & 1:
+                current = RFC6962MerkleTree._hash_internal(sibling, current)
+            else:
+                current = RFC6962MerkleTree._hash_internal(current, sibling)
+        return current == proof["root"]
+
+
+# 测试代码
+def test_sparse_merkle_tree():
+    num_items = 50
+    print(f"生成{num_items}个键值对...")
+    items = {f"key-{i}".encode(): bytes(random.getrandbits(8) for _ in range(16)) for i in range(num_items)}
+
+    start = time.time()
+    smt = SparseMerkleTree()
+    for key, value in items.items():
+        smt.update(key, value)
+    single_time = time.time() - start
+
+    start = time.time()
+    batch_smt = SparseMerkleTree(items)
+    batch_time = time.time() - start
+    print(f"逐个更新耗时: {single_time:.3f}秒, 批量更新耗时: {batch_time:.3f}秒")
+    print(f"根哈希一致: {smt.root == batch_smt.root}, 根哈希: {smt.root[:16]}..., 缓存节点数: {len(smt.nodes)}\n")
+
+    # 存在性证明
+    key = random.choice(list(items))
+    proof = smt.get_proof(key)
+    print(f"存在性证明测试: {'成功' if SparseMerkleTree.verify_proof(proof) and proof['value'] == items[key] else '失败'}"
+          f"（压缩后{len(proof['siblings'])}/{DEPTH}个兄弟哈希）")
+
+    # 不存在性证明
+    proof = smt.get_proof(b"missing-key")
+    print(f"不存在性证明测试: {'成功' if SparseMerkleTree.verify_proof(proof) and proof['value'] is None else '失败'}"
+          f"（压缩后{len(proof['siblings'])}/{DEPTH}个兄弟哈希）")
+
+    # 删除后根哈希应回到未插入该键时的状态
+    smt.update(key, None)
+    rest = SparseMerkleTree({k: v for k, v in items.items() if k != key})
+    print(f"删除测试: {'成功' if smt.root == rest.root else '失败'}")
+
+
+if __name__ == "__main__":
+    test_sparse_merkle_tree()
@@ -0,0 +1,28 @@
+# SM2国密算法包
+#
+#   field    域运算层：p/n上的模运算；模逆与模幂（开方）走可插拔大数后端（gmpy2 / ctypes / 纯Python）
+#   hash     哈希层：SM3（复用project_4_sm3，自动选择后端）与KDF
+#   curve    曲线层：点运算、各类标量乘与点编码
+#   protocol 协议层：密钥生成、加解密、签名验签
+#
+# 常用接口在此统一导出，`from sm2 import ...` 即可使用全部快速路径。
+from .field import (
+    BACKEND as FIELD_BACKEND, p, n, mod_inverse, batch_inverse, sqrt_mod_p,
+    field_mul, field_sqr, field_pow
+)
+from .hash import BACKEND as SM3_BACKEND, sm3_new, sm3_digest, kdf, KDFStream
+from .curve import (
+    a, b, Gx, Gy, G, bytes_to_int, int_to_bytes, is_on_curve, point_add, point_mul,
+    JACOBIAN_INFINITY, to_jacobian, from_jacobian, batch_from_jacobian,
+    jacobian_double, jacobian_add, jacobian_add_affine, jacobian_mul,
+    SCALAR_BLINDING_BITS, SCALAR_BITS, blind_scalar, ladder_mul,
+    FixedBaseTable, G_TABLE_PATH_ENV, get_G_table, base_point_mul, base_point_mul_ct,
+    wnaf, WNAFTable, multi_scalar_mul,
+    DECOMPRESS_CACHE_SIZE, encode_point, decompress_point, decode_point
+)
+from .protocol import (
+    key_generation, C1C3C2, C1C2C3, STREAM_CHUNK_SIZE, SM2Encryptor, SM2Decryptor,
+    sm2_encrypt_bytes, sm2_decrypt_bytes, sm2_encrypt_file, sm2_decrypt_file,
+    sm2_encrypt, sm2_decrypt, compute_ZA, compute_e, sign_with_e, verify_with_e,
+    sm2_sign, sm2_verify
+)
@@ -0,0 +1,553 @@
+# 曲线层：仿射/Jacobian点运算、标量乘（变基点、固定基点表、wNAF多标量乘、秘密标量阶梯）与点编码
+import os
+import secrets
+import threading
+from functools import lru_cache
+from .field import p, n, mod_inverse, batch_inverse, sqrt_mod_p
+
+# SM2推荐曲线参数（素数p与阶n由域运算层定义）
+a = 0x787968B4FA32C3FD2417842E73BBFEFF2F3C848B6831D7E0EC65228B3937E498
+b = 0x63E4C6D3B23B0C849CF84241484BFE48F61D59A5B16BA06E6E12D1DA27C5249A
+Gx = 0x421DEBD61B62EAB6746434EBC3CC315E32220B3BADD50BDC4C4E6C147FEDD43D
+Gy = 0x0680512BCBB42C07D47349D2153B70C4E5D7FDFCBFA36EA1A85841B9E46E09A2
+G = (Gx, Gy)
+
+
+def bytes_to_int(b):
+    """字节串转整数"""
+    return int.from_bytes(b, byteorder='big')
+
+
+def int_to_bytes(i):
+    """整数转32字节串"""
+    return i.to_bytes(32, byteorder='big')
+
+
+def point_add(p1, p2):
+    """椭圆曲线点加法"""
+    if p1 is None:
+        return p2
+    if p2 is None:
+        return p1
+
+    x1, y1 = p1
+    x2, y2 = p2
+
+    # 无穷远点判断
+    if x1 == x2 and y1 != y2:
+        return None
+
+    # 计算斜率
+    if x1 != x2:
+        lam = ((y2 - y1) * mod_inverse((x2 - x1) % p, p)) % p
+    else:
+        lam = ((3 * x1 ** 2 + a) * mod_inverse((2 * y1) % p, p)) % p
+
+    # 计算相加结果
+    x3 = (lam ** 2 - x1 - x2) % p
+    y3 = (lam * (x1 - x3) - y1) % p
+
+    return (x3, y3)
+
+
+# Jacobian坐标：(X, Y, Z) 表示仿射点 (X/Z^2, Y/Z^3)，Z = 0 为无穷远点。
+# 点加/倍点全程无需求逆，只在标量乘结束时做一次归一化。
+JACOBIAN_INFINITY = (1, 1, 0)
+
+
+def to_jacobian(point):
+    """仿射坐标转Jacobian坐标"""
+    if point is None:
+        return JACOBIAN_INFINITY
+    return (point[0], point[1], 1)
+
+
+def from_jacobian(jp):
+    """Jacobian坐标转仿射坐标（一次模逆）"""
+    X, Y, Z = jp
+    if Z == 0:
+        return None
+    z_inv = mod_inverse(Z, p)
+    z_inv2 = (z_inv * z_inv) % p
+    return ((X * z_inv2) % p, (Y * z_inv2 * z_inv) % p)
+
+
+def batch_from_jacobian(points):
+    """批量Jacobian转仿射：Montgomery同时求逆，N个点只做一次模逆"""
+    result = []
+    for (X, Y, Z), z_inv in zip(points, batch_inverse([Z for _, _, Z in points], p)):
+        if Z == 0:
+            result.append(None)
+            continue
+        z_inv2 = (z_inv * z_inv) % p
+        result.append(((X * z_inv2) % p, (Y * z_inv2 * z_inv) % p))
+    return result
+
+
+# 以下点运算公式的模乘直接使用Python整数（见field.py说明），只有求逆经过域运算后端
+def jacobian_double(jp):
+    """Jacobian坐标倍点（适用于一般a，不依赖a = -3）"""
+    X1, Y1, Z1 = jp
+    if Z1 == 0 or Y1 == 0:
+        return JACOBIAN_INFINITY
+
+    YY = (Y1 * Y1) % p
+    ZZ = (Z1 * Z1) % p
+    S = (4 * X1 * YY) % p
+    M = (3 * X1 * X1 + a * ZZ * ZZ) % p
+    X3 = (M * M - 2 * S) % p
+    Y3 = (M * (S - X3) - 8 * YY * YY) % p
+    Z3 = (2 * Y1 * Z1) % p
+    return (X3, Y3, Z3)
+
+
+def jacobian_add(jp1, jp2):
+    """Jacobian坐标点加"""
+    X1, Y1, Z1 = jp1
+    X2, Y2, Z2 = jp2
+    if Z1 == 0:
+        return jp2
+    if Z2 == 0:
+        return jp1
+
+    Z1Z1 = (Z1 * Z1) % p
+    Z2Z2 = (Z2 * Z2) % p
+    U1 = (X1 * Z2Z2) % p
+    U2 = (X2 * Z1Z1) % p
+    S1 = (Y1 * Z2 * Z2Z2) % p
+    S2 = (Y2 * Z1 * Z1Z1) % p
+    H = (U2 - U1) % p
+    r = (S2 - S1) % p
+    if H == 0:
+        # 同一点则倍点，互为相反点则得到无穷远点
+        return jacobian_double(jp1) if r == 0 else JACOBIAN_INFINITY
+
+    HH = (H * H) % p
+    HHH = (H * HH) % p
+    V = (U1 * HH) % p
+    X3 = (r * r - HHH - 2 * V) % p
+    Y3 = (r * (V - X3) - S1 * HHH) % p
+    Z3 = (Z1 * Z2 * H) % p
+    return (X3, Y3, Z3)
+
+
+def jacobian_add_affine(jp, point):
+    """Jacobian点加仿射点（混合坐标，省去Z2相关乘法）"""
+    if point is None:
+        return jp
+    X1, Y1, Z1 = jp
+    if Z1 == 0:
+        return to_jacobian(point)
+    x2, y2 = point
+
+    Z1Z1 = (Z1 * Z1) % p
+    U2 = (x2 * Z1Z1) % p
+    S2 = (y2 * Z1 * Z1Z1) % p
+    H = (U2 - X1) % p
+    r = (S2 - Y1) % p
+    if H == 0:
+        return jacobian_double(jp) if r == 0 else JACOBIAN_INFINITY
+
+    HH = (H * H) % p
+    HHH = (H * HH) % p
+    V = (X1 * HH) % p
+    X3 = (r * r - HHH - 2 * V) % p
+    Y3 = (r * (V - X3) - Y1 * HHH) % p
+    Z3 = (Z1 * H) % p
+    return (X3, Y3, Z3)
+
+
+def jacobian_mul(k, point):
+    """标量乘k*P，结果保持Jacobian坐标（从高位到低位的倍点加法）"""
+    result = JACOBIAN_INFINITY
+    if point is None or k <= 0:
+        return result
+    for bit in bin(k)[2:]:
+        result = jacobian_double(result)
+        if bit == '1':
+            result = jacobian_add_affine(result, point)
+    return result
+
+
+def point_mul(k, p):
+    """椭圆曲线点乘法（Jacobian坐标倍点加法，结束时归一化一次）"""
+    return from_jacobian(jacobian_mul(k, p))
+
+
+# 秘密标量（私钥d、随机数k）专用的标量乘：运算序列只取决于固定的比特长度，与标量取值无关。
+# 标量先做随机化 k' = k + r*n（r随机，k'恰为SCALAR_BITS位），每次调用的比特序列都不同。
+# 注：Python大整数运算本身不是常数时间，这里消除的是由标量比特决定的分支与点运算次数差异。
+SCALAR_BLINDING_BITS = 64
+SCALAR_BITS = n.bit_length() + SCALAR_BLINDING_BITS
+
+
+def blind_scalar(k):
+    """返回 k + r*n，r在使结果最高位恰为第SCALAR_BITS位的范围内均匀随机选取"""
+    k %= n
+    low = 1 << (SCALAR_BITS - 1)
+    r_min = (low - k + n - 1) // n
+    r_max = ((low << 1) - 1 - k) // n
+    return k + (r_min + secrets.randbelow(r_max - r_min + 1)) * n
+
+
+def _xycz_idbl(point):
+    """co-Z初始倍点：由仿射点P得到共享Z坐标的(2P, P)"""
+    x, y = point
+    xx = (x * x) % p
+    yy = (y * y) % p
+    yyyy = (yy * yy) % p
+    S = (4 * x * yy) % p
+    M = (3 * xx + a) % p
+    X2 = (M * M - 2 * S) % p
+    Y2 = (M * (S - X2) - 8 * yyyy) % p
+    return (X2, Y2), (S, (8 * yyyy) % p), (2 * y) % p
+
+
+def _xycz_add(R, P, Z):
+    """co-Z点加：返回(R + P, 与之共享Z的R, 新Z)"""
+    X1, Y1 = R
+    X2, Y2 = P
+    dX = (X2 - X1) % p
+    A = (dX * dX) % p
+    B = (X1 * A) % p
+    C = (X2 * A) % p
+    dY = (Y2 - Y1) % p
+    E = (Y1 * (C - B)) % p
+    X3 = (dY * dY - B - C) % p
+    Y3 = (dY * (B - X3) - E) % p
+    return (X3, Y3), (B, E), (Z * dX) % p
+
+
+def _xycz_addc(R, P, Z):
+    """co-Z共轭点加：返回(R + P, R - P, 新Z)，两者共享Z坐标"""
+    X1, Y1 = R
+    X2, Y2 = P
+    dX = (X2 - X1) % p
+    A = (dX * dX) % p
+    B = (X1 * A) % p
+    C = (X2 * A) % p
+    dY = (Y2 - Y1) % p
+    sY = (Y2 + Y1) % p
+    E = (Y1 * (C - B)) % p
+    X3 = (dY * dY - B - C) % p
+    Y3 = (dY * (B - X3) - E) % p
+    X4 = (sY * sY - B - C) % p
+    Y4 = (sY * (X4 - B) - E) % p
+    return (X3, Y3), (X4, Y4), (Z * dX) % p
+
+
+def ladder_mul(k, point):
+    """秘密标量乘k*P（co-Z Montgomery阶梯 + 标量随机化），返回Jacobian坐标
+
+    每一位固定执行一次共轭点加和一次点加（XYCZ-ADDC / XYCZ-ADD），不依赖a = -3。
+    只有结果为无穷远点等概率约2^-256的退化情况才退回普通标量乘。
+    """
+    if point is None or k % n == 0:
+        return JACOBIAN_INFINITY
+    blinded = blind_scalar(k)
+    R1, R0, Z = _xycz_idbl(point)
+    R = [R0, R1]
+    for i in range(SCALAR_BITS - 2, -1, -1):
+        bit = (blinded >> i) & 1
+        R[1 - bit], R[bit], Z = _xycz_addc(R[bit], R[1 - bit], Z)
+        R[bit], R[1 - bit], Z = _xycz_add(R[1 - bit], R[bit], Z)
+    if Z == 0:
+        return jacobian_mul(k % n, point)
+    return (R[0][0], R[0][1], Z)
+
+
+class FixedBaseTable:
+    """固定基点窗口预计算表：table[i][j] = j * 2^(w*i) * P（仿射坐标）
+
+    标量按w比特分窗，k*P = sum(table[i][digit_i])，只需混合点加、无需倍点。
+    """
+
+    MAGIC = b'SM2FBT1'
+
+    def __init__(self, point, window=6, table=None):
+        if not 4 <= window <= 8:
+            raise ValueError("窗口宽度必须在4到8比特之间")
+        self.point = point
+        self.window = window
+        self.num_windows = self.window_count(window)
+        self.table = table if table is not None else self._build()
+
+    @staticmethod
+    def window_count(window):
+        """窗口数：覆盖n.bit_length() + 1位，mul_ct中的奇数化标量（< 2n）也能完整编码"""
+        return (n.bit_length() + window) // window
+
+    def _build(self):
+        size = 1 << self.window
+        jacobian_rows = []
+        base = to_jacobian(self.point)
+        for _ in range(self.num_windows):
+            row = []
+            acc = JACOBIAN_INFINITY
+            for _ in range(1, size):
+                acc = jacobian_add(acc, base)
+                row.append(acc)
+            jacobian_rows.append(row)
+            base = jacobian_add(acc, base)  # 2^w * base
+
+        # 整张表一次批量归一化
+        affine = batch_from_jacobian([jp for row in jacobian_rows for jp in row])
+        return [[None] + affine[i * (size - 1):(i + 1) * (size - 1)] for i in range(self.num_windows)]
+
+    def mul(self, k):
+        """计算k*P，返回Jacobian坐标"""
+        k %= n
+        mask = (1 << self.window) - 1
+        result = JACOBIAN_INFINITY
+        for row in self.table:
+            digit = k & mask
+            if digit:
+                result = jacobian_add_affine(result, row[digit])
+            k >>= self.window
+        return result
+
+    def mul_ct(self, k):
+        """秘密标量的k*P：每个窗口固定做一次混合点加，返回Jacobian坐标
+
+        k随机拆分为 k1 + k2 (mod n)，两部分都调整为奇数后做正则有符号编码
+        （每位都是非零奇数，|d| < 2^w），因此点加次数与标量取值无关。
+        """
+        k %= n
+        k1 = secrets.randbelow(n) | 1
+        k2 = (k - k1) % n
+        k2 += n * (1 - (k2 & 1))  # n为奇数，加n后变为奇数且模n不变
+        result = JACOBIAN_INFINITY
+        for part in (k1, k2):
+            for row, d in zip(self.table, self._regular_digits(part)):
+                x, y = row[abs(d)]
+                result = jacobian_add_affine(result, (x, y) if d > 0 else (x, p - y))
+        return result
+
+    def _regular_digits(self, k):
+        """奇数k的正则有符号窗口编码（低位在前），共num_windows位，每位为奇数"""
+        w = self.window
+        mask = (1 << (w + 1)) - 1
+        digits = []
+        for _ in range(self.num_windows - 1):
+            d = (k & mask) - (1 << w)
+            digits.append(d)
+            k = (k - d) >> w
+        digits.append(k)
+        return digits
+
+    def save(self, path):
+        """序列化到磁盘：MAGIC || w || 各窗口的 x||y（每点64字节）"""
+        with open(path, 'wb') as f:
+            f.write(self.MAGIC + bytes([self.window]))
+            f.write(int_to_bytes(self.point[0]) + int_to_bytes(self.point[1]))
+            for row in self.table:
+                for x, y in row[1:]:
+                    f.write(int_to_bytes(x) + int_to_bytes(y))
+
+    @classmethod
+    def load(cls, path, point):
+        """从磁盘加载预计算表，并逐项校验内容
+
+        校验 table[0][1] == P、table[i][j] == table[i][j-1] + table[i][1]，
+        以及下一窗口首项 == table[i][2^w-1] + table[i][1]。由归纳法整张表都被确定，
+        任何被替换或篡改的项都会被发现；所有仿射点加一次批量归一化，开销与重建相当。
+        """
+        with open(path, 'rb') as f:
+            data = f.read()
+        header_len = len(cls.MAGIC) + 1
+        if data[:len(cls.MAGIC)] != cls.MAGIC or len(data) < header_len + 64:
+            raise ValueError("预计算表文件格式错误")
+        window = data[len(cls.MAGIC)]
+        if not 4 <= window <= 8:
+            raise ValueError("预计算表窗口宽度错误")
+        stored_point = (bytes_to_int(data[header_len:header_len + 32]),
+                        bytes_to_int(data[header_len + 32:header_len + 64]))
+        if stored_point != point:
+            raise ValueError("预计算表基点不匹配")
+
+        size = 1 << window
+        num_windows = cls.window_count(window)
+        body = data[header_len + 64:]
+        if len(body) != num_windows * (size - 1) * 64:
+            raise ValueError("预计算表长度错误")
+
+        table = []
+        offset = 0
+        for _ in range(num_windows):
+            row = [None]
+            for _ in range(1, size):
+                row.append((bytes_to_int(body[offset:offset + 32]), bytes_to_int(body[offset + 32:offset + 64])))
+                offset += 64
+            table.append(row)
+
+        if table[0][1] != point:
+            raise ValueError("预计算表内容校验失败")
+        sums = []
+        expected = []
+        for i, row in enumerate(table):
+            last = size if i + 1 < num_windows else size - 1
+            for j in range(2, last + 1):
+                sums.append(jacobian_add_affine(to_jacobian(row[j - 1]), row[1]))
+                expected.append(row[j] if j < size else table[i + 1][1])
+        if batch_from_jacobian(sums) != expected:
+            raise ValueError("预计算表内容校验失败")
+        return cls(point, window, table)
+
+
+# 基点G的进程级预计算表，首次使用时构建；设置环境变量SM2_G_TABLE_PATH可从磁盘加载/保存
+G_TABLE_PATH_ENV = "SM2_G_TABLE_PATH"
+_G_TABLE = None
+_G_TABLE_LOCK = threading.Lock()
+
+
+def get_G_table():
+    """获取基点G的预计算表（惰性构建，进程内共享）"""
+    global _G_TABLE
+    if _G_TABLE is None:
+        with _G_TABLE_LOCK:
+            if _G_TABLE is None:
+                path = os.environ.get(G_TABLE_PATH_ENV)
+                table = None
+                if path and os.path.exists(path):
+                    try:
+                        table = FixedBaseTable.load(path, G)
+                    except ValueError:
+                        table = None
+                if table is None:
+                    table = FixedBaseTable(G)
+                    if path:
+                        table.save(path)
+                _G_TABLE = table
+    return _G_TABLE
+
+
+def base_point_mul(k):
+    """固定基点标量乘k*G（查表，只有点加）"""
+    return from_jacobian(get_G_table().mul(k))
+
+
+def base_point_mul_ct(k):
+    """秘密标量的固定基点标量乘k*G（点加序列与k无关）"""
+    return from_jacobian(get_G_table().mul_ct(k))
+
+
+def wnaf(k, w):
+    """计算k的宽度为w的NAF表示（低位在前），非零位均为奇数且|d| < 2^(w-1)"""
+    digits = []
+    while k > 0:
+        if k & 1:
+            d = k & ((1 << w) - 1)
+            if d >= 1 << (w - 1):
+                d -= 1 << w
+            k -= d
+        else:
+            d = 0
+        digits.append(d)
+        k >>= 1
+    return digits
+
+
+def _odd_multiples(jp, w):
+    """Jacobian奇数倍点表 [P, 3P, 5P, ..., (2^(w-1)-1)P]"""
+    double = jacobian_double(jp)
+    table = [jp]
+    for _ in range(1, 1 << (w - 2)):
+        table.append(jacobian_add(table[-1], double))
+    return table
+
+
+class WNAFTable:
+    """变基点wNAF奇数倍点表（仿射坐标）：table[j] = j*P（j为奇数），供同一点反复使用"""
+
+    def __init__(self, point, window=5):
+        self.point = point
+        self.window = window
+        self.table = [None] * (1 << (window - 1))
+        for i, affine in enumerate(batch_from_jacobian(_odd_multiples(to_jacobian(point), window))):
+            self.table[2 * i + 1] = affine
+
+
+def multi_scalar_mul(terms, window=5):
+    """多标量乘 sum(k_i * P_i)（Straus/Shamir交错wNAF），返回Jacobian坐标
+
+    所有项共享同一条倍点链；基点G直接复用固定基点表第0行（j*G, j < 2^w）作为
+    宽度w+1的wNAF奇数倍点表，P_i为WNAFTable时直接使用其预计算表，
+    其余点临时预计算宽度window的奇数倍点表（Jacobian坐标，无需求逆）。
+    """
+    entries = []
+    for k, point in terms:
+        k %= n
+        if k == 0 or point is None:
+            continue
+        if isinstance(point, WNAFTable):
+            entries.append((wnaf(k, point.window), point.table, True))
+        elif point == G:
+            g_table = get_G_table()
+            entries.append((wnaf(k, g_table.window + 1), g_table.table[0], True))
+        else:
+            entries.append((wnaf(k, window), [None] + _odd_multiples(to_jacobian(point), window), False))
+
+    result = JACOBIAN_INFINITY
+    if not entries:
+        return result
+    for i in range(max(len(digits) for digits, _, _ in entries) - 1, -1, -1):
+        result = jacobian_double(result)
+        for digits, table, is_affine in entries:
+            if i >= len(digits) or digits[i] == 0:
+                continue
+            d = digits[i]
+            if is_affine:
+                x, y = table[abs(d)]
+                result = jacobian_add_affine(result, (x, y) if d > 0 else (x, p - y))
+            else:
+                X, Y, Z = table[(abs(d) + 1) >> 1]
+                result = jacobian_add(result, (X, Y, Z) if d > 0 else (X, p - Y, Z))
+    return result
+
+
+def is_on_curve(point):
+    """验证点是否在椭圆曲线上"""
+    x, y = point
+    left = (y * y) % p
+    right = (x * x * x + a * x + b) % p
+    return left == right
+
+
+# SEC1点编码：压缩 02/03 || x（33字节），非压缩 04 || x || y（65字节）；
+# decode_point也接受旧格式的64字节 x || y。
+DECOMPRESS_CACHE_SIZE = 1 << 16
+
+
+def encode_point(point, compressed=True):
+    """点编码为SEC1格式字节串"""
+    x, y = point
+    if compressed:
+        return bytes([2 | (y & 1)]) + int_to_bytes(x)
+    return b'\x04' + int_to_bytes(x) + int_to_bytes(y)
+
+
+@lru_cache(maxsize=DECOMPRESS_CACHE_SIZE)
+def decompress_point(prefix, x):
+    """由x坐标与奇偶前缀（2或3）恢复点：y^2 = x^3 + ax + b，一次模幂开方；热点公钥走LRU缓存"""
+    if prefix not in (2, 3) or not 0 <= x < p:
+        raise ValueError("压缩点格式错误")
+    y = sqrt_mod_p(x * x * x + a * x + b)
+    if y is None:
+        raise ValueError("x坐标不对应曲线上的点")
+    if (y & 1) != (prefix & 1):
+        y = p - y
+    return (x, y)
+
+
+def decode_point(data):
+    """解析SEC1编码（压缩/非压缩）或64字节x || y，返回曲线上的仿射点"""
+    if len(data) == 33:
+        return decompress_point(data[0], bytes_to_int(data[1:]))
+    if len(data) == 65 and data[0] == 4:
+        data = data[1:]
+    if len(data) != 64:
+        raise ValueError("点编码长度错误")
+    point = (bytes_to_int(data[:32]), bytes_to_int(data[32:]))
+    if not (point[0] < p and point[1] < p and is_on_curve(point)):
+        raise ValueError("点不在曲线上")
+    return point
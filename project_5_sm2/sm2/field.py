@@ -0,0 +1,259 @@
+# 域运算层：SM2素数域与标量（模n）运算
+#
+# 大数后端在导入时选定一次：已安装gmpy2时默认使用gmpy2，否则使用纯Python。
+#   gmpy2  - GMP的mpz运算
+#   ctypes - sm2_field_ext.so（4×64位limb的256位Montgomery乘法，仅支持模p与模n）；
+#            每次调用都要做整数与字节串的转换，单次运算反而慢于纯Python，
+#            因此不会被自动选用，只能通过环境变量显式指定（用于对比测试）
+#   python - 纯Python整数运算（始终可用的兜底实现）
+# 可通过环境变量 SM2_FIELD_BACKEND 强制指定后端。
+#
+# 后端只负责开销集中的单次大运算：模逆（mod_inverse，batch_inverse与坐标归一化都经由它）
+# 和模幂（sqrt_mod_p，点解压）。曲线层点运算公式中的模乘/平方直接写成Python整数的
+# (x * y) % p：256位乘法本身只需几十纳秒，经后端分发的函数调用与类型转换开销更大。
+# field_mul/field_sqr/field_pow导出供基准测试比较各后端的单次运算。
+import ctypes
+import os
+
+p = 0x8542D69E4C044F18E8B92435BF6FF7DE457283915C45517D722EDB8B08F1DFC3
+n = 0x8542D69E4C044F18E8B92435BF6FF7DD297720630485628D5AE74EE7C32E79B7
+
+FIELD_BACKEND_ENV = "SM2_FIELD_BACKEND"
+
+
+class PythonBackend:
+    """纯Python实现：求逆使用内置的扩展欧几里得（pow(a, -1, m)），比费马小定理快约5倍"""
+
+    name = "python"
+
+    @staticmethod
+    def mul(x, y, m):
+        return (x * y) % m
+
+    @staticmethod
+    def sqr(x, m):
+        return (x * x) % m
+
+    @staticmethod
+    def pow(x, e, m):
+        return pow(x, e, m)
+
+    @staticmethod
+    def inverse(x, m):
+        return pow(x, -1, m)
+
+
+class Gmpy2Backend:
+    """GMP实现：输入输出仍为Python整数，内部转换为mpz计算"""
+
+    name = "gmpy2"
+
+    def __init__(self, gmpy2):
+        self._mpz = gmpy2.mpz
+        self._powmod = gmpy2.powmod
+        self._invert = gmpy2.invert
+
+    def mul(self, x, y, m):
+        return int(self._mpz(x) * y % m)
+
+    def sqr(self, x, m):
+        x = self._mpz(x)
+        return int(x * x % m)
+
+    def pow(self, x, e, m):
+        return int(self._powmod(x, e, m))
+
+    def inverse(self, x, m):
+        return int(self._invert(x, m))
+
+
+class CtypesBackend:
+    """C扩展实现：模p/模n走Montgomery乘法，其他模数退回纯Python"""
+
+    name = "ctypes"
+    _MODULUS_IDS = {p: 0, n: 1}
+
+    def __init__(self, lib):
+        self.lib = lib
+        for fn in (lib.sm2_field_mul, lib.sm2_field_pow):
+            fn.argtypes = [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_char_p, ctypes.c_int]
+            fn.restype = None
+
+    def _call(self, fn, x, y, m):
+        out = ctypes.create_string_buffer(32)
+        fn(x.to_bytes(32, 'big'), y.to_bytes(32, 'big'), out, self._MODULUS_IDS[m])
+        return int.from_bytes(out.raw, 'big')
+
+    def mul(self, x, y, m):
+        if m not in self._MODULUS_IDS:
+            return PythonBackend.mul(x, y, m)
+        return self._call(self.lib.sm2_field_mul, x % m, y % m, m)
+
+    def sqr(self, x, m):
+        return self.mul(x, x, m)
+
+    def pow(self, x, e, m):
+        if m not in self._MODULUS_IDS or not 0 <= e < 1 << 256:
+            return PythonBackend.pow(x, e, m)
+        return self._call(self.lib.sm2_field_pow, x % m, e, m)
+
+    def inverse(self, x, m):
+        if m not in self._MODULUS_IDS:
+            return PythonBackend.inverse(x, m)
+        return self.pow(x, m - 2, m)
+
+
+def _load_gmpy2():
+    import gmpy2
+    return Gmpy2Backend(gmpy2)
+
+
+def _load_ctypes():
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    for name in ("sm2_field_ext.so", "sm2_field_ext.dll"):
+        lib_path = os.path.join(current_dir, name)
+        if os.path.exists(lib_path):
+            return CtypesBackend(ctypes.CDLL(lib_path))
+    return None
+
+
+def _self_test(backend):
+    """用纯Python结果校验后端（模p、模n各取一组固定数据）"""
+    for m in (p, n):
+        x, y = m - 3, m // 7
+        if backend.mul(x, y, m) != (x * y) % m or backend.inverse(x, m) != pow(x, -1, m):
+            return False
+        if backend.pow(x, m - 3, m) != pow(x, m - 3, m):
+            return False
+    return True
+
+
+def available_backends():
+    """返回所有可加载且通过自检的后端 {名称: 后端}，纯Python总在其中"""
+    backends = {}
+    for name, loader in (("gmpy2", _load_gmpy2), ("ctypes", _load_ctypes)):
+        try:
+            backend = loader()
+        except (ImportError, OSError, AttributeError):
+            continue
+        if backend is not None and _self_test(backend):
+            backends[name] = backend
+    backends["python"] = PythonBackend()
+    return backends
+
+
+# 未显式指定时可自动选用的后端（按优先级）
+_AUTO_BACKENDS = ("gmpy2", "python")
+
+
+def _select_backend():
+    backends = available_backends()
+    forced = os.environ.get(FIELD_BACKEND_ENV)
+    if forced:
+        if forced not in backends:
+            raise ImportError(f"SM2域运算后端不可用: {forced}（可用: {', '.join(backends)}）")
+        return backends[forced]
+    return next(backends[name] for name in _AUTO_BACKENDS if name in backends)
+
+
+_BACKEND = _select_backend()
+BACKEND = _BACKEND.name
+
+# 当前后端的单次运算（仅供基准测试；点运算公式不经过这里）
+field_mul = _BACKEND.mul
+field_sqr = _BACKEND.sqr
+field_pow = _BACKEND.pow
+
+
+def mod_inverse(a, m):
+    """模逆运算（由当前后端计算，m为素数）"""
+    a %= m
+    if a == 0:
+        raise ValueError("0没有模逆")
+    return _BACKEND.inverse(a, m)
+
+
+# p ≡ 3 (mod 4)，平方根可直接取 x^((p+1)/4)
+assert p % 4 == 3
+_SQRT_EXP = (p + 1) // 4
+
+
+def sqrt_mod_p(x):
+    """模p平方根（一次模幂），x不是二次剩余时返回None"""
+    x %= p
+    y = _BACKEND.pow(x, _SQRT_EXP, p)
+    return y if (y * y) % p == x else None
+
+
+def batch_inverse(values, m):
+    """Montgomery同时求逆：N个元素只做一次模逆和约3N次模乘
+
+    值为0（模m）的元素没有逆元，对应位置返回0，其余元素不受影响。
+    """
+    prefix = []
+    acc = 1
+    for v in values:
+        prefix.append(acc)
+        if v % m:
+            acc = (acc * v) % m
+
+    inv = mod_inverse(acc, m)
+    result = [0] * len(values)
+    for i in range(len(values) - 1, -1, -1):
+        v = values[i] % m
+        if v == 0:
+            continue
+        result[i] = (inv * prefix[i]) % m
+        inv = (inv * v) % m
+    return result
+
+
+# 编译辅助函数
+def compile_library():
+    """编译sm2_field_ext.c为共享库（需要支持unsigned __int128的GCC/Clang）"""
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    source_path = os.path.join(current_dir, "sm2_field_ext.c")
+    output_path = os.path.join(current_dir, "sm2_field_ext.so")
+    cmd = f"gcc -shared -fPIC -O3 {source_path} -o {output_path}"
+    print(f"编译命令: {cmd}")
+    os.system(cmd)
+
+
+# 测试代码
+if __name__ == "__main__":
+    import random
+    import sys
+    import time
+
+    if "--compile" in sys.argv:
+        compile_library()
+
+    def per_op(fn, args, rounds):
+        start = time.perf_counter()
+        for x, y in args[:rounds]:
+            fn(x, y)
+        return (time.perf_counter() - start) / rounds * 1e6
+
+    count = 1000
+    xs = [random.randrange(1, p) for _ in range(count)]
+    pairs = list(zip(xs, reversed(xs)))
+
+    print(f"当前后端: {BACKEND}")
+    for name, backend in available_backends().items():
+        mul_us = per_op(lambda x, y: backend.mul(x, y, p), pairs, count)
+        sqr_us = per_op(lambda x, y: backend.sqr(x, p), pairs, count)
+        inv_us = per_op(lambda x, y: backend.inverse(x, p), pairs, 200)
+        pow_us = per_op(lambda x, y: backend.pow(x, y, p), pairs, 200)
+        print(f"{name:>7}: 模乘 {mul_us:.3f} us, 平方 {sqr_us:.3f} us, "
+              f"求逆 {inv_us:.2f} us, 模幂 {pow_us:.2f} us")
+
+    start = time.perf_counter()
+    single = [mod_inverse(v, p) for v in xs]
+    single_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = batch_inverse(xs, p)
+    batch_time = time.perf_counter() - start
+
+    print(f"逐个求逆: {single_time * 1000:.2f} ms, 批量求逆: {batch_time * 1000:.2f} ms（{count}个元素）")
+    print(f"结果一致: {single == batch}")
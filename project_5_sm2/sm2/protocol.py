@@ -0,0 +1,296 @@
+# 协议层：密钥生成、加解密（含流式接口）、ZA/e计算与签名验签
+import secrets
+from .curve import (
+    n, a, b, Gx, Gy, bytes_to_int, int_to_bytes, from_jacobian, is_on_curve, ladder_mul,
+    base_point_mul_ct, multi_scalar_mul, G
+)
+from .field import mod_inverse
+from .hash import sm3_digest, sm3_new, KDFStream
+
+
+def key_generation():
+    """生成SM2密钥对"""
+    d = secrets.randbelow(n - 2) + 1  # 私钥，取值[1, n-2]
+    Q = base_point_mul_ct(d)  # 公钥（d*G）
+    return d, Q
+
+
+# 密文布局：GB/T 32918-2016 为 C1||C3||C2，旧版标准/部分实现为 C1||C2||C3
+C1C3C2 = "C1C3C2"
+C1C2C3 = "C1C2C3"
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def _xor_bytes(data, keystream):
+    """整块异或（转为大整数一次完成）"""
+    size = len(data)
+    return (int.from_bytes(data, 'big') ^ int.from_bytes(keystream, 'big')).to_bytes(size, 'big')
+
+
+def _check_layout(layout):
+    if layout not in (C1C3C2, C1C2C3):
+        raise ValueError(f"不支持的密文布局: {layout}")
+
+
+class SM2Encryptor:
+    """SM2流式加密：header为C1，update逐块输出C2，finalize返回C3
+
+    密钥流由KDF中间状态按块派生，C3 = SM3(x2 || M || y2)边加密边累计，内存占用与消息长度无关。
+    """
+
+    def __init__(self, Q):
+        # 生成随机数k并计算C1 = k*G
+        k = secrets.randbelow(n - 1) + 1
+        C1 = base_point_mul_ct(k)
+        if C1 is None:
+            raise ValueError("生成C1失败")
+
+        # 计算k*Q得到(x2, y2)
+        kQ = from_jacobian(ladder_mul(k, Q))
+        if kQ is None:
+            raise ValueError("计算k*Q失败")
+        x2_bytes = int_to_bytes(kQ[0])
+        self._y2_bytes = int_to_bytes(kQ[1])
+
+        self.header = int_to_bytes(C1[0]) + int_to_bytes(C1[1])
+        self._keystream = KDFStream(x2_bytes + self._y2_bytes)
+        self._c3 = sm3_new(x2_bytes)
+        self._t_nonzero = False
+
+    def update(self, data):
+        """加密一块明文，返回对应的C2片段"""
+        if not data:
+            return b''
+        t = self._keystream.read(len(data))
+        self._t_nonzero = self._t_nonzero or t.count(0) != len(t)
+        self._c3.update(data)
+        return _xor_bytes(data, t)
+
+    def finalize(self):
+        """返回C3"""
+        if not self._t_nonzero:
+            raise ValueError("KDF生成的t全为0")
+        self._c3.update(self._y2_bytes)
+        return self._c3.digest()
+
+
+class SM2Decryptor:
+    """SM2流式解密：update逐块解密C2，finalize(C3)校验哈希
+
+    注意：校验在全部C2处理完之后才进行，调用方在finalize成功前不应信任已输出的明文。
+    """
+
+    def __init__(self, d, C1_bytes):
+        if len(C1_bytes) != 64:
+            raise ValueError("密文长度不足")
+
+        # 解析C1点并验证是否在曲线上
+        x1 = bytes_to_int(C1_bytes[:32])
+        y1 = bytes_to_int(C1_bytes[32:])
+        if not is_on_curve((x1, y1)):
+            raise ValueError("C1不在曲线上")
+
+        # 计算d*C1得到(x2, y2)
+        dC1 = from_jacobian(ladder_mul(d, (x1, y1)))
+        if dC1 is None:
+            raise ValueError("计算d*C1失败")
+        x2_bytes = int_to_bytes(dC1[0])
+        self._y2_bytes = int_to_bytes(dC1[1])
+
+        self._keystream = KDFStream(x2_bytes + self._y2_bytes)
+        self._u = sm3_new(x2_bytes)
+
+    def update(self, data):
+        """解密一块C2，返回对应的明文片段"""
+        if not data:
+            return b''
+        plaintext = _xor_bytes(data, self._keystream.read(len(data)))
+        self._u.update(plaintext)
+        return plaintext
+
+    def finalize(self, C3_bytes):
+        """校验C3，不一致时抛出ValueError"""
+        self._u.update(self._y2_bytes)
+        if self._u.digest() != C3_bytes:
+            raise ValueError("解密失败：哈希验证不通过")
+
+
+def sm2_encrypt_bytes(M, Q, layout=C1C3C2):
+    """SM2加密字节串"""
+    _check_layout(layout)
+    encryptor = SM2Encryptor(Q)
+    C2 = encryptor.update(M)
+    C3 = encryptor.finalize()
+    if layout == C1C3C2:
+        return encryptor.header + C3 + C2
+    return encryptor.header + C2 + C3
+
+
+def sm2_decrypt_bytes(C, d, layout=C1C3C2):
+    """SM2解密字节串"""
+    _check_layout(layout)
+    if len(C) < 96:
+        raise ValueError("密文长度不足")
+    decryptor = SM2Decryptor(d, C[:64])
+    if layout == C1C3C2:
+        C3, C2 = C[64:96], C[96:]
+    else:
+        C2, C3 = C[64:-32], C[-32:]
+    M = decryptor.update(C2)
+    decryptor.finalize(C3)
+    return M
+
+
+def sm2_encrypt_file(src, dst, Q, layout=C1C3C2, chunk_size=STREAM_CHUNK_SIZE):
+    """流式加密文件对象src到dst，返回写入的密文长度
+
+    C1||C3||C2布局需要在末尾回填C3，dst必须可seek；不可seek的输出请使用C1||C2||C3。
+    """
+    _check_layout(layout)
+    encryptor = SM2Encryptor(Q)
+    dst.write(encryptor.header)
+    if layout == C1C3C2:
+        c3_offset = dst.tell()
+        dst.write(bytes(32))
+    total = 96
+    while True:
+        chunk = src.read(chunk_size)
+        if not chunk:
+            break
+        dst.write(encryptor.update(chunk))
+        total += len(chunk)
+    C3 = encryptor.finalize()
+    if layout == C1C3C2:
+        end = dst.tell()
+        dst.seek(c3_offset)
+        dst.write(C3)
+        dst.seek(end)
+    else:
+        dst.write(C3)
+    return total
+
+
+def _read_exact(src, size):
+    data = src.read(size)
+    if len(data) != size:
+        raise ValueError("密文长度不足")
+    return data
+
+
+def sm2_decrypt_file(src, dst, d, layout=C1C3C2, chunk_size=STREAM_CHUNK_SIZE):
+    """流式解密文件对象src到dst，返回明文长度；C3校验失败时抛出ValueError（dst中已写入的内容应丢弃）"""
+    _check_layout(layout)
+    decryptor = SM2Decryptor(d, _read_exact(src, 64))
+    total = 0
+    if layout == C1C3C2:
+        C3 = _read_exact(src, 32)
+        while True:
+            chunk = src.read(chunk_size)
+            if not chunk:
+                break
+            dst.write(decryptor.update(chunk))
+            total += len(chunk)
+    else:
+        # C3在末尾：始终保留最后32字节不解密
+        tail = b''
+        while True:
+            chunk = src.read(chunk_size)
+            if not chunk:
+                break
+            data = tail + chunk
+            body, tail = data[:-32], data[-32:]
+            dst.write(decryptor.update(body))
+            total += len(body)
+        if len(tail) != 32:
+            raise ValueError("密文长度不足")
+        C3 = tail
+    decryptor.finalize(C3)
+    return total
+
+
+def sm2_encrypt(M, Q):
+    """SM2加密算法（M为str，按UTF-8编码；密文布局C1 || C3 || C2）"""
+    return sm2_encrypt_bytes(M.encode('utf-8'), Q)
+
+
+def sm2_decrypt(C, d):
+    """SM2解密算法（返回UTF-8解码后的str）"""
+    return sm2_decrypt_bytes(C, d).decode('utf-8')
+
+
+def compute_ZA(Q, user_id=b"1234567812345678"):
+    """计算ZA = SM3(entl || ID || a || b || Gx || Gy || xA || yA)，返回32字节"""
+    entl = len(user_id) * 8  # ID长度（位）
+    entl_bytes = entl.to_bytes(2, byteorder='big')
+
+    a_bytes = int_to_bytes(a)
+    b_bytes = int_to_bytes(b)
+    Gx_bytes = int_to_bytes(Gx)
+    Gy_bytes = int_to_bytes(Gy)
+    xA_bytes = int_to_bytes(Q[0])
+    yA_bytes = int_to_bytes(Q[1])
+
+    za_input = entl_bytes + user_id + a_bytes + b_bytes + Gx_bytes + Gy_bytes + xA_bytes + yA_bytes
+    return sm3_digest(za_input)
+
+
+def compute_e(ZA, M):
+    """计算e = SM3(ZA || M)，返回整数；M可为str（按UTF-8编码）或bytes"""
+    M_bytes = M.encode('utf-8') if isinstance(M, str) else M
+    return bytes_to_int(sm3_digest(ZA + M_bytes))
+
+
+def sign_with_e(e_int, d, d_inv=None):
+    """对已计算的e生成签名(r, s)；d_inv为预计算的(1 + d)^-1 mod n"""
+    if d_inv is None:
+        d_inv = mod_inverse((1 + d) % n, n)
+    while True:
+        k = secrets.randbelow(n - 1) + 1
+        kG = base_point_mul_ct(k)
+        if kG is None:
+            continue
+        x1 = kG[0]
+        r = (e_int + x1) % n
+        if r != 0 and (r + k) % n != 0:
+            break
+
+    s = (d_inv * (k - r * d)) % n
+    s = (s + n) % n  # 确保s为正数
+    return (r, s)
+
+
+def verify_with_e(e_int, signature, Q):
+    """对已计算的e验证签名；Q可以是公钥点，也可以是其WNAFTable预计算表"""
+    r, s = signature
+    # 验证r和s的范围
+    if r < 1 or r >= n or s < 1 or s >= n:
+        return False
+
+    t = (r + s) % n
+    if t == 0:
+        return False
+
+    # 一条倍点链同时计算sG + tQ，只做一次归一化
+    x1y1 = from_jacobian(multi_scalar_mul([(s, G), (t, Q)]))
+    if x1y1 is None:
+        return False
+    x1, _ = x1y1
+
+    R = (e_int + x1) % n
+    return R == r
+
+
+def sm2_sign(M, d, user_id=b"1234567812345678"):
+    """SM2签名算法"""
+    Q = base_point_mul_ct(d)
+    e_int = compute_e(compute_ZA(Q, user_id), M)
+    return sign_with_e(e_int, d)
+
+
+def sm2_verify(M, signature, Q, user_id=b"1234567812345678"):
+    """SM2验签算法"""
+    r, s = signature
+    if r < 1 or r >= n or s < 1 or s >= n:
+        return False
+    e_int = compute_e(compute_ZA(Q, user_id), M)
+    return verify_with_e(e_int, signature, Q)
@@ -0,0 +1,173 @@
+/*
+ * SM2素数域/标量域的256位Montgomery乘法（4×64位limb）
+ * 编译命令: gcc -O3 -shared -fPIC sm2_field_ext.c -o sm2_field_ext.so (Linux)
+ * 输入输出均为32字节大端整数，modulus_id: 0 = 素数p, 1 = 阶n
+ */
+
+#include <stdint.h>
+#include <string.h>
+
+typedef unsigned __int128 u128;
+
+typedef struct {
+    uint64_t m[4];      // 模数（小端limb）
+    uint64_t minv;      // -m^-1 mod 2^64
+    uint64_t r2[4];     // R^2 mod m, R = 2^256
+} mont_ctx;
+
+static const uint8_t MODULI[2][32] = {
+    {   // p
+        0x85, 0x42, 0xD6, 0x9E, 0x4C, 0x04, 0x4F, 0x18, 0xE8, 0xB9, 0x24, 0x35, 0xBF, 0x6F, 0xF7, 0xDE,
+        0x45, 0x72, 0x83, 0x91, 0x5C, 0x45, 0x51, 0x7D, 0x72, 0x2E, 0xDB, 0x8B, 0x08, 0xF1, 0xDF, 0xC3
+    },
+    {   // n
+        0x85, 0x42, 0xD6, 0x9E, 0x4C, 0x04, 0x4F, 0x18, 0xE8, 0xB9, 0x24, 0x35, 0xBF, 0x6F, 0xF7, 0xDD,
+        0x29, 0x77, 0x20, 0x63, 0x04, 0x85, 0x62, 0x8D, 0x5A, 0xE7, 0x4E, 0xE7, 0xC3, 0x2E, 0x79, 0xB7
+    }
+};
+
+static mont_ctx CTX[2];
+static int initialized = 0;
+
+static void load_be(const uint8_t in[32], uint64_t out[4]) {
+    for (int i = 0; i < 4; i++) {
+        uint64_t v = 0;
+        for (int j = 0; j < 8; j++) {
+            v = (v << 8) | in[(3 - i) * 8 + j];
+        }
+        out[i] = v;
+    }
+}
+
+static void store_be(const uint64_t in[4], uint8_t out[32]) {
+    for (int i = 0; i < 4; i++) {
+        for (int j = 0; j < 8; j++) {
+            out[(3 - i) * 8 + j] = (uint8_t)(in[i] >> (56 - 8 * j));
+        }
+    }
+}
+
+// a >= m 时返回1
+static int geq(const uint64_t a[4], const uint64_t m[4]) {
+    for (int i = 3; i >= 0; i--) {
+        if (a[i] != m[i]) {
+            return a[i] > m[i];
+        }
+    }
+    return 1;
+}
+
+static void sub_m(uint64_t a[4], const uint64_t m[4]) {
+    uint64_t borrow = 0;
+    for (int i = 0; i < 4; i++) {
+        u128 d = (u128)a[i] - m[i] - borrow;
+        a[i] = (uint64_t)d;
+        borrow = (uint64_t)(d >> 64) & 1;
+    }
+}
+
+// CIOS Montgomery乘法：r = a * b * R^-1 mod m（a, b < m）
+static void mont_mul(const mont_ctx* c, const uint64_t a[4], const uint64_t b[4], uint64_t r[4]) {
+    uint64_t t[6] = {0};
+
+    for (int i = 0; i < 4; i++) {
+        u128 s;
+        uint64_t carry = 0;
+        for (int j = 0; j < 4; j++) {
+            s = (u128)a[i] * b[j] + t[j] + carry;
+            t[j] = (uint64_t)s;
+            carry = (uint64_t)(s >> 64);
+        }
+        s = (u128)t[4] + carry;
+        t[4] = (uint64_t)s;
+        t[5] = (uint64_t)(s >> 64);
+
+        uint64_t q = t[0] * c->minv;
+        s = (u128)q * c->m[0] + t[0];
+        carry = (uint64_t)(s >> 64);
+        for (int j = 1; j < 4; j++) {
+            s = (u128)q * c->m[j] + t[j] + carry;
+            t[j - 1] = (uint64_t)s;
+            carry = (uint64_t)(s >> 64);
+        }
+        s = (u128)t[4] + carry;
+        t[3] = (uint64_t)s;
+        t[4] = t[5] + (uint64_t)(s >> 64);
+        t[5] = 0;
+    }
+
+    memcpy(r, t, 4 * sizeof(uint64_t));
+    if (t[4] || geq(r, c->m)) {
+        sub_m(r, c->m);
+    }
+}
+
+static void init_ctx(mont_ctx* c, const uint8_t modulus[32]) {
+    load_be(modulus, c->m);
+
+    // 牛顿迭代求 m0^-1 mod 2^64
+    uint64_t inv = 1;
+    for (int i = 0; i < 6; i++) {
+        inv *= 2 - c->m[0] * inv;
+    }
+    c->minv = (uint64_t)0 - inv;
+
+    // R^2 mod m = 2^512 mod m，由1反复倍加得到
+    uint64_t r[4] = {1, 0, 0, 0};
+    for (int i = 0; i < 512; i++) {
+        uint64_t top = r[3] >> 63;
+        r[3] = (r[3] << 1) | (r[2] >> 63);
+        r[2] = (r[2] << 1) | (r[1] >> 63);
+        r[1] = (r[1] << 1) | (r[0] >> 63);
+        r[0] <<= 1;
+        if (top || geq(r, c->m)) {
+            sub_m(r, c->m);
+        }
+    }
+    memcpy(c->r2, r, sizeof(r));
+}
+
+static void ensure_init(void) {
+    if (!initialized) {
+        init_ctx(&CTX[0], MODULI[0]);
+        init_ctx(&CTX[1], MODULI[1]);
+        initialized = 1;
+    }
+}
+
+// 导出：out = a * b mod m
+void sm2_field_mul(const uint8_t a[32], const uint8_t b[32], uint8_t out[32], int modulus_id) {
+    ensure_init();
+    const mont_ctx* c = &CTX[modulus_id & 1];
+    uint64_t x[4], y[4], r[4];
+
+    load_be(a, x);
+    load_be(b, y);
+    mont_mul(c, x, c->r2, x);   // x*R
+    mont_mul(c, x, y, r);       // (x*R)*y*R^-1 = x*y
+    store_be(r, out);
+}
+
+// 导出：out = base^exp mod m（从高位到低位的平方-乘，全程在Montgomery域内）
+void sm2_field_pow(const uint8_t base[32], const uint8_t exp[32], uint8_t out[32], int modulus_id) {
+    ensure_init();
+    const mont_ctx* c = &CTX[modulus_id & 1];
+    const uint64_t one[4] = {1, 0, 0, 0};
+    uint64_t x[4], acc[4];
+
+    load_be(base, x);
+    mont_mul(c, x, c->r2, x);       // base*R
+    mont_mul(c, one, c->r2, acc);   // 1*R
+
+    for (int i = 0; i < 32; i++) {
+        for (int bit = 7; bit >= 0; bit--) {
+            mont_mul(c, acc, acc, acc);
+            if ((exp[i] >> bit) & 1) {
+                mont_mul(c, acc, x, acc);
+            }
+        }
+    }
+
+    mont_mul(c, acc, one, acc);     // 移出Montgomery域
+    store_be(acc, out);
+}
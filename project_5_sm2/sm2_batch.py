@@ -0,0 +1,159 @@
+import random
+import secrets
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from sm2 import n, G, compute_ZA, compute_e, multi_scalar_mul, batch_from_jacobian, get_G_table, batch_inverse
+from sm2_keys import DEFAULT_USER_ID, SM2PublicKey, get_public_key
+
+
+def _verify_chunk(items, user_id=DEFAULT_USER_ID):
+    """验证一组(M, (r, s), Q)：按公钥分组复用ZA与预计算表，最后统一批量归一化"""
+    results = [False] * len(items)
+
+    groups = defaultdict(list)
+    for idx, (_, _, Q) in enumerate(items):
+        groups[Q].append(idx)
+
+    pending = []  # (索引, r, e, sG + tQ 的Jacobian坐标)
+    for Q, indices in groups.items():
+        try:
+            # 同一公钥出现多次才值得构建预计算表
+            public_key = get_public_key(Q) if len(indices) > 1 else SM2PublicKey(Q)
+        except (ValueError, TypeError):
+            continue
+        za = public_key.za(user_id)
+        target = public_key.table or public_key.point
+
+        for idx in indices:
+            M, (r, s), _ = items[idx]
+            if r < 1 or r >= n or s < 1 or s >= n:
+                continue
+            t = (r + s) % n
+            if t == 0:
+                continue
+            try:
+                e_int = compute_e(za, M)
+            except (TypeError, AttributeError):
+                # 消息类型错误只判该条无效，不影响同组其他签名
+                continue
+            pending.append((idx, r, e_int, multi_scalar_mul([(s, G), (t, target)])))
+
+    points = batch_from_jacobian([jp for _, _, _, jp in pending])
+    for (idx, r, e_int, _), point in zip(pending, points):
+        results[idx] = point is not None and (e_int + point[0]) % n == r
+    return results
+
+
+def sm2_verify_batch(items, user_id=DEFAULT_USER_ID, processes=None, chunk_size=256):
+    """批量SM2验签
+
+    参数:
+        items: (M, (r, s), Q) 列表
+        user_id: 签名者ID
+        processes: 进程数，None或1表示在当前进程内完成
+        chunk_size: 分发给每个进程的任务块大小
+
+    返回:
+        (逐条结果列表, 统计信息{"count", "seconds", "throughput"（次/秒）})
+    """
+    items = list(items)
+    start = time.perf_counter()
+
+    if not processes or processes <= 1 or len(items) <= chunk_size:
+        results = _verify_chunk(items, user_id)
+    else:
+        # 按公钥排序后再分块，同一公钥尽量落在同一个进程里复用预计算表
+        order = sorted(range(len(items)), key=lambda i: items[i][2] or (0, 0))
+        chunks = [order[i:i + chunk_size] for i in range(0, len(order), chunk_size)]
+        results = [False] * len(items)
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            chunk_results = pool.map(
+                _verify_chunk,
+                [[items[i] for i in chunk] for chunk in chunks],
+                [user_id] * len(chunks)
+            )
+            for chunk, chunk_result in zip(chunks, chunk_results):
+                for i, ok in zip(chunk, chunk_result):
+                    results[i] = ok
+
+    seconds = time.perf_counter() - start
+    stats = {
+        "count": len(items),
+        "seconds": seconds,
+        "throughput": len(items) / seconds if seconds > 0 else float('inf')
+    }
+    return results, stats
+
+
+def sm2_sign_batch(items, user_id=DEFAULT_USER_ID):
+    """批量签名(M, d)列表
+
+    各私钥的公钥与(1 + d)^-1、所有k*G的归一化分别只做一次批量求逆。
+    私钥必须在[1, n-2]范围内（d = n-1时1 + d没有逆元），否则抛出ValueError。
+    """
+    items = list(items)
+    ds = list(dict.fromkeys(d for _, d in items))
+    for d in ds:
+        if not 1 <= d <= n - 2:
+            raise ValueError("私钥必须在[1, n-2]范围内")
+    table = get_G_table()
+    public_points = batch_from_jacobian([table.mul_ct(d) for d in ds])
+    d_invs = batch_inverse([(1 + d) % n for d in ds], n)
+    za = {d: compute_ZA(Q, user_id) for d, Q in zip(ds, public_points)}
+    d_inv = dict(zip(ds, d_invs))
+    e_ints = [compute_e(za[d], M) for M, d in items]
+
+    signatures = [None] * len(items)
+    pending = list(range(len(items)))
+    while pending:
+        ks = [secrets.randbelow(n - 1) + 1 for _ in pending]
+        points = batch_from_jacobian([table.mul_ct(k) for k in ks])
+        retry = []
+        for idx, k, kG in zip(pending, ks, points):
+            d = items[idx][1]
+            r = (e_ints[idx] + kG[0]) % n if kG is not None else 0
+            if r == 0 or (r + k) % n == 0:
+                retry.append(idx)
+                continue
+            s = (d_inv[d] * (k - r * d)) % n
+            if s == 0:
+                retry.append(idx)
+                continue
+            signatures[idx] = (r, s)
+        pending = retry
+    return signatures
+
+
+# 测试代码
+if __name__ == "__main__":
+    import os
+    from sm2 import sm2_verify
+    from sm2_keys import SM2PrivateKey
+
+    keys = [SM2PrivateKey.generate() for _ in range(8)]
+    items = []
+    for i in range(800):
+        key = random.choice(keys)
+        message = f"日志记录 {i}"
+        items.append((message, key.sign(message), key.public_key.point))
+    start = time.perf_counter()
+    batch_signatures = sm2_sign_batch([(M, keys[0].d) for M, _, _ in items[:200]])
+    print(f"批量签名: {200 / (time.perf_counter() - start):.1f} 次/秒, "
+          f"验证通过: {all(keys[0].public_key.verify(M, sig) for (M, _, _), sig in zip(items, batch_signatures))}")
+
+    # 混入篡改的记录
+    items[10] = ("被篡改的日志", items[10][1], items[10][2])
+
+    start = time.perf_counter()
+    single_results = [sm2_verify(M, sig, Q) for M, sig, Q in items]
+    single_seconds = time.perf_counter() - start
+    print(f"逐条验签: {len(items) / single_seconds:.1f} 次/秒")
+
+    results, stats = sm2_verify_batch(items)
+    print(f"批量验签（单进程）: {stats['throughput']:.1f} 次/秒, 结果一致: {results == single_results}")
+
+    workers = os.cpu_count() or 1
+    results, stats = sm2_verify_batch(items, processes=workers, chunk_size=100)
+    print(f"批量验签（{workers}进程）: {stats['throughput']:.1f} 次/秒, 结果一致: {results == single_results}")
+    print(f"失败条目: {[i for i, ok in enumerate(results) if not ok]}")
@@ -0,0 +1,212 @@
+# SM2性能基准
+#
+#   python sm2_benchmark.py                         # 所有可用域运算后端，结果写入sm2_benchmark.json
+#   python sm2_benchmark.py --backends python --quick
+#   python sm2_benchmark.py --profile sign          # 对单一操作做cProfile，统计写入sm2_sign.prof
+#
+# 每个后端在独立子进程中运行（SM2_FIELD_BACKEND在导入时生效），结果按后端汇总为JSON。
+# 域运算后端只负责模逆与模幂（见sm2/field.py），点运算公式不经过后端：只有BACKEND_DEPENDENT
+# 中的各项随后端变化，其余操作在各后端下执行同一份Python代码（仅末尾的坐标归一化求逆经过后端），
+# 列间差异基本是测量噪声。表格中以*标出依赖后端的项。
+import argparse
+import cProfile
+import json
+import os
+import platform
+import pstats
+import random
+import subprocess
+import sys
+import time
+
+from sm2.field import FIELD_BACKEND_ENV, available_backends, compile_library
+
+DEFAULT_SIZES = [32, 1024, 64 * 1024, 1024 * 1024]
+
+# 耗时主要落在域运算后端上的操作
+BACKEND_DEPENDENT = frozenset({
+    "field_mul", "field_sqr", "field_inverse", "field_batch_inverse_256", "field_sqrt", "point_decompress",
+})
+
+
+def bench(fn, min_time=0.2, max_rounds=100000):
+    """重复调用fn直到累计min_time秒，返回每次调用的平均/最小耗时（微秒）"""
+    fn()  # 预热（惰性构建的表、缓存等不计入）
+    samples = []
+    total = 0.0
+    while total < min_time and len(samples) < max_rounds:
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        samples.append(elapsed)
+        total += elapsed
+    return {
+        "rounds": len(samples),
+        "mean_us": total / len(samples) * 1e6,
+        "min_us": min(samples) * 1e6,
+    }
+
+
+def _operations(sizes):
+    """构造 {名称: 无参函数}；输入数据在此预先生成，不计入耗时"""
+    from sm2 import (
+        n, p, G, jacobian_add, jacobian_add_affine, jacobian_double, jacobian_mul,
+        ladder_mul, multi_scalar_mul, get_G_table, encode_point, decode_point, decompress_point,
+        sm2_encrypt_bytes, sm2_decrypt_bytes, key_generation,
+        field_mul, field_sqr, mod_inverse, batch_inverse, sqrt_mod_p
+    )
+    from sm2_keys import SM2PrivateKey, SM2PublicKey
+
+    table = get_G_table()
+    key = SM2PrivateKey.generate()
+    Q = key.public_key.point
+    x, y = random.randrange(1, p), random.randrange(1, p)
+    k = random.randrange(1, n)
+    values = [random.randrange(1, p) for _ in range(256)]
+    jp1 = table.mul(random.randrange(1, n))
+    jp2 = table.mul(random.randrange(1, n))
+    compressed = encode_point(Q)
+    message = b"benchmark message"
+    signature = key.sign(message)
+    plain_key = SM2PublicKey(Q)
+    precomputed_key = SM2PublicKey(Q).precompute()
+
+    ops = {
+        # 域运算
+        "field_mul": lambda: field_mul(x, y, p),
+        "field_sqr": lambda: field_sqr(x, p),
+        "field_inverse": lambda: mod_inverse(x, p),
+        "field_batch_inverse_256": lambda: batch_inverse(values, p),
+        "field_sqrt": lambda: sqrt_mod_p(x),
+        # 点运算
+        "point_double": lambda: jacobian_double(jp1),
+        "point_add": lambda: jacobian_add(jp1, jp2),
+        "point_add_mixed": lambda: jacobian_add_affine(jp1, G),
+        # 标量乘
+        "scalar_mul_fixed_base": lambda: table.mul(k),
+        "scalar_mul_fixed_base_ct": lambda: table.mul_ct(k),
+        "scalar_mul_variable_base": lambda: jacobian_mul(k, Q),
+        "scalar_mul_variable_base_ct": lambda: ladder_mul(k, Q),
+        "scalar_mul_double": lambda: multi_scalar_mul([(k, G), (x, Q)]),
+        # 协议
+        "keygen": key_generation,
+        "sign": lambda: key.sign(message),
+        "verify": lambda: plain_key.verify(message, signature),
+        "verify_precomputed": lambda: precomputed_key.verify(message, signature),
+        # 点压缩：绕过LRU缓存的开方解压 / 命中缓存的解码
+        "point_decompress": lambda: decompress_point.__wrapped__(compressed[0], Q[0]),
+        "point_decode_cached": lambda: decode_point(compressed),
+    }
+
+    for size in sizes:
+        payload = os.urandom(size)
+        ciphertext = sm2_encrypt_bytes(payload, Q)
+        ops[f"encrypt_{size}"] = lambda payload=payload: sm2_encrypt_bytes(payload, Q)
+        ops[f"decrypt_{size}"] = lambda ciphertext=ciphertext: sm2_decrypt_bytes(ciphertext, key.d)
+    return ops
+
+
+def run_all(sizes, min_time):
+    """在当前进程（当前后端）下运行全部基准"""
+    from sm2 import FIELD_BACKEND, SM3_BACKEND
+
+    results = {}
+    for name, fn in _operations(sizes).items():
+        result = bench(fn, min_time)
+        if name.startswith(("encrypt_", "decrypt_")):
+            size = int(name.split("_")[1])
+            result["mb_per_s"] = size / (result["mean_us"] / 1e6) / (1024 * 1024)
+        else:
+            result["ops_per_s"] = 1e6 / result["mean_us"]
+        results[name] = result
+    return {"field_backend": FIELD_BACKEND, "sm3_backend": SM3_BACKEND, "results": results}
+
+
+def run_backend(backend, sizes, min_time):
+    """在子进程中以指定域运算后端运行基准，返回其JSON结果"""
+    env = dict(os.environ, **{FIELD_BACKEND_ENV: backend})
+    cmd = [sys.executable, os.path.abspath(__file__), "--worker",
+           "--sizes", ",".join(map(str, sizes)), "--min-time", str(min_time)]
+    output = subprocess.run(cmd, env=env, check=True, capture_output=True, text=True).stdout
+    return json.loads(output)
+
+
+def profile(operation, sizes, count, output_path):
+    """对单一操作做cProfile，统计写入output_path并打印累计耗时前20项"""
+    ops = _operations(sizes)
+    if operation not in ops:
+        raise SystemExit(f"未知操作: {operation}（可选: {', '.join(ops)}）")
+    fn = ops[operation]
+    fn()
+    profiler = cProfile.Profile()
+    profiler.enable()
+    for _ in range(count):
+        fn()
+    profiler.disable()
+    profiler.dump_stats(output_path)
+    print(f"{operation} x{count}，统计已写入 {output_path}")
+    pstats.Stats(output_path).sort_stats("cumulative").print_stats(20)
+
+
+def print_table(report):
+    names = list(next(iter(report["backends"].values()))["results"])
+    backends = list(report["backends"])
+    print(f"{'操作（*依赖域运算后端）':<34}" + "".join(f"{name:>16}" for name in backends))
+    for name in names:
+        cells = []
+        for backend in backends:
+            result = report["backends"][backend]["results"][name]
+            cells.append(f"{result['mb_per_s']:.2f} MB/s" if "mb_per_s" in result else f"{result['mean_us']:.2f} us")
+        label = f"{name} *" if name in BACKEND_DEPENDENT else name
+        print(f"{label:<34}" + "".join(f"{cell:>16}" for cell in cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SM2性能基准")
+    parser.add_argument("--backends", help="逗号分隔的域运算后端，默认全部可用后端")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="加解密消息长度（字节）")
+    parser.add_argument("--min-time", type=float, default=0.2, help="每项基准的最少累计时间（秒）")
+    parser.add_argument("--quick", action="store_true", help="缩短测量时间并只测小消息")
+    parser.add_argument("--output", default="sm2_benchmark.json", help="JSON结果路径")
+    parser.add_argument("--profile", metavar="OP", help="只对指定操作做cProfile")
+    parser.add_argument("--profile-count", type=int, default=200)
+    parser.add_argument("--profile-output", help="pstats输出路径，默认sm2_<OP>.prof")
+    parser.add_argument("--compile", action="store_true", help="先编译sm2/sm2_field_ext.so以启用ctypes后端")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+    min_time = args.min_time
+    if args.quick:
+        sizes = [size for size in sizes if size <= 64 * 1024]
+        min_time = min(min_time, 0.05)
+
+    if args.worker:
+        json.dump(run_all(sizes, min_time), sys.stdout)
+        return
+    if args.profile:
+        profile(args.profile, sizes, args.profile_count, args.profile_output or f"sm2_{args.profile}.prof")
+        return
+    if args.compile:
+        compile_library()
+
+    backends = args.backends.split(",") if args.backends else list(available_backends())
+    report = {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "sizes": sizes,
+        "backend_dependent": sorted(BACKEND_DEPENDENT),
+        "backends": {},
+    }
+    for backend in backends:
+        print(f"运行后端 {backend} ...", file=sys.stderr)
+        report["backends"][backend] = run_backend(backend, sizes, min_time)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print_table(report)
+    print(f"\n结果已写入 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
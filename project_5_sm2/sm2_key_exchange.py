@@ -0,0 +1,133 @@
+import hmac
+import secrets
+from sm2 import (
+    n, is_on_curve, int_to_bytes, from_jacobian, batch_from_jacobian,
+    get_G_table, multi_scalar_mul, ladder_mul, sm3_digest, kdf
+)
+from sm2_keys import DEFAULT_USER_ID, SM2PublicKey
+
+# w = ceil(ceil(log2(n)) / 2) - 1，x̄ = 2^w + (x & (2^w - 1))
+W = (n.bit_length() + 1) // 2 - 1
+
+
+def _x_bar(x):
+    return (1 << W) + (x & ((1 << W) - 1))
+
+
+def generate_ephemerals(count):
+    """批量生成临时密钥对[(r, R)]：固定基点表计算r*G，所有点一次批量归一化
+
+    临时密钥与对端无关，可以在握手前离线预生成。
+    """
+    table = get_G_table()
+    rs = [secrets.randbelow(n - 1) + 1 for _ in range(count)]
+    points = batch_from_jacobian([table.mul_ct(r) for r in rs])
+    return [(r, R) for r, R in zip(rs, points) if R is not None]
+
+
+def generate_ephemeral():
+    return generate_ephemerals(1)[0]
+
+
+class SM2KeyExchange:
+    """SM2密钥交换（GB/T 32918.3），发起方A与响应方B使用同一个类
+
+    用法（A、B各持一个实例，交换临时公钥R后各自compute）：
+        B.compute(A.R) -> B把(B.R, B.confirmation)发给A
+        A.compute(B.R) -> A.verify_confirmation(SB)，再把A.confirmation发给B
+        B.verify_confirmation(SA)
+    共享点 U = t * (P_peer + x̄_peer * R_peer)：括号内只含公开值，走变长多标量乘
+    （对端公钥传入SM2PublicKey且已precompute时直接复用其wNAF表）；秘密标量t只经过一次蒙哥马利阶梯。
+    """
+
+    def __init__(self, private_key, peer_public_key, initiator, klen=16,
+                 user_id=DEFAULT_USER_ID, peer_user_id=DEFAULT_USER_ID, ephemeral=None):
+        if not isinstance(peer_public_key, SM2PublicKey):
+            peer_public_key = SM2PublicKey(peer_public_key)
+        self.private_key = private_key
+        self.peer_public_key = peer_public_key
+        self.initiator = initiator
+        self.klen = klen
+        self._r, self.R = ephemeral if ephemeral is not None else generate_ephemeral()
+
+        own_za = private_key.public_key.za(user_id)
+        peer_za = peer_public_key.za(peer_user_id)
+        self._za, self._zb = (own_za, peer_za) if initiator else (peer_za, own_za)
+        self.key = None
+        self.confirmation = None
+        self._expected = None
+
+    def compute(self, peer_R):
+        """由对端临时公钥计算共享密钥，返回klen字节的密钥"""
+        if peer_R is None or not is_on_curve(peer_R):
+            raise ValueError("对端临时公钥不在曲线上")
+
+        t = (self.private_key.d + _x_bar(self.R[0]) * self._r) % n
+        peer = self.peer_public_key.table or self.peer_public_key.point
+        base = from_jacobian(multi_scalar_mul([(1, peer), (_x_bar(peer_R[0]), peer_R)]))
+        shared = from_jacobian(ladder_mul(t, base)) if base is not None else None
+        if shared is None:
+            raise ValueError("协商失败：共享点为无穷远点")
+
+        xu, yu = int_to_bytes(shared[0]), int_to_bytes(shared[1])
+        self.key = kdf(xu + yu + self._za + self._zb, self.klen)
+
+        RA, RB = (self.R, peer_R) if self.initiator else (peer_R, self.R)
+        inner = sm3_digest(xu + self._za + self._zb + int_to_bytes(RA[0]) + int_to_bytes(RA[1])
+                           + int_to_bytes(RB[0]) + int_to_bytes(RB[1]))
+        s_b = sm3_digest(b'\x02' + yu + inner)
+        s_a = sm3_digest(b'\x03' + yu + inner)
+        self.confirmation, self._expected = (s_a, s_b) if self.initiator else (s_b, s_a)
+        return self.key
+
+    def verify_confirmation(self, S):
+        """校验对端的确认值（发起方校验SB，响应方校验SA）"""
+        if self._expected is None:
+            raise ValueError("尚未计算共享密钥")
+        return hmac.compare_digest(self._expected, S)
+
+
+def handshake(initiator_key, responder_key, klen=16, initiator_ephemeral=None, responder_ephemeral=None):
+    """在本进程内完成一次带双向确认的握手，返回(A的密钥, B的密钥)"""
+    A = SM2KeyExchange(initiator_key, responder_key.public_key, True, klen, ephemeral=initiator_ephemeral)
+    B = SM2KeyExchange(responder_key, initiator_key.public_key, False, klen, ephemeral=responder_ephemeral)
+    B.compute(A.R)
+    A.compute(B.R)
+    if not A.verify_confirmation(B.confirmation) or not B.verify_confirmation(A.confirmation):
+        raise ValueError("密钥确认失败")
+    return A.key, B.key
+
+
+# 测试代码
+if __name__ == "__main__":
+    import time
+    from sm2_keys import SM2PrivateKey
+
+    alice = SM2PrivateKey.generate()
+    bob = SM2PrivateKey.generate()
+
+    key_a, key_b = handshake(alice, bob)
+    print(f"协商密钥: A={key_a.hex()} B={key_b.hex()} 一致: {key_a == key_b}")
+
+    mallory = SM2PrivateKey.generate()
+    A = SM2KeyExchange(alice, bob.public_key, True)
+    B = SM2KeyExchange(mallory, alice.public_key, False)
+    B.compute(A.R)
+    A.compute(B.R)
+    print(f"冒充响应方被发现: {not A.verify_confirmation(B.confirmation)}")
+
+    rounds = 100
+    start = time.perf_counter()
+    for _ in range(rounds):
+        handshake(alice, bob)
+    plain = rounds / (time.perf_counter() - start)
+
+    # 对端公钥预计算wNAF表 + 临时密钥离线批量生成
+    alice.public_key.precompute()
+    bob.public_key.precompute()
+    ephemerals = generate_ephemerals(2 * rounds)
+    start = time.perf_counter()
+    for i in range(rounds):
+        handshake(alice, bob, initiator_ephemeral=ephemerals[2 * i], responder_ephemeral=ephemerals[2 * i + 1])
+    precomputed = rounds / (time.perf_counter() - start)
+    print(f"握手: {plain:.1f} 次/秒, 公钥预计算+临时密钥预生成: {precomputed:.1f} 次/秒")
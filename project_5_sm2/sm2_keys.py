@@ -0,0 +1,95 @@
+from functools import lru_cache
+from sm2 import (
+    n, mod_inverse, base_point_mul_ct, is_on_curve, key_generation,
+    compute_ZA, compute_e, sign_with_e, verify_with_e, WNAFTable, encode_point, decode_point
+)
+
+DEFAULT_USER_ID = b"1234567812345678"
+
+
+class SM2PublicKey:
+    """SM2公钥对象：缓存各用户ID对应的ZA，以及可选的wNAF预计算表"""
+
+    def __init__(self, Q):
+        if Q is None or not is_on_curve(Q):
+            raise ValueError("公钥不在曲线上")
+        self.point = Q
+        self._za_cache = {}
+        self.table = None
+
+    @classmethod
+    def from_bytes(cls, data):
+        """由SEC1编码（压缩/非压缩）或64字节x || y构造公钥"""
+        return cls(decode_point(data))
+
+    def to_bytes(self, compressed=True):
+        return encode_point(self.point, compressed)
+
+    def za(self, user_id=DEFAULT_USER_ID):
+        """获取ZA（每个用户ID只计算一次）"""
+        za = self._za_cache.get(user_id)
+        if za is None:
+            za = compute_ZA(self.point, user_id)
+            self._za_cache[user_id] = za
+        return za
+
+    def precompute(self, window=5):
+        """构建wNAF奇数倍点表，之后的验签直接查表"""
+        if self.table is None or self.table.window != window:
+            self.table = WNAFTable(self.point, window)
+        return self
+
+    def verify(self, M, signature, user_id=DEFAULT_USER_ID):
+        r, s = signature
+        if r < 1 or r >= n or s < 1 or s >= n:
+            return False
+        e_int = compute_e(self.za(user_id), M)
+        return verify_with_e(e_int, signature, self.table or self.point)
+
+
+class SM2PrivateKey:
+    """SM2私钥对象：一次性计算公钥Q与(1 + d)^-1 mod n，签名时复用"""
+
+    def __init__(self, d):
+        if not 1 <= d <= n - 2:
+            raise ValueError("私钥必须在[1, n-2]范围内")
+        self.d = d
+        self.public_key = SM2PublicKey(base_point_mul_ct(d))
+        self._d_inv = mod_inverse((1 + d) % n, n)
+
+    @classmethod
+    def generate(cls):
+        d, _ = key_generation()
+        return cls(d)
+
+    def sign(self, M, user_id=DEFAULT_USER_ID):
+        e_int = compute_e(self.public_key.za(user_id), M)
+        return sign_with_e(e_int, self.d, self._d_inv)
+
+
+@lru_cache(maxsize=1024)
+def get_public_key(Q, window=5):
+    """带LRU上限的公钥预计算缓存，适合反复验证同一批签名者的验签方"""
+    return SM2PublicKey(Q).precompute(window)
+
+
+# 测试代码
+if __name__ == "__main__":
+    import time
+
+    private_key = SM2PrivateKey.generate()
+    Q = private_key.public_key.point
+    message = "这是一个SM2密钥对象的测试消息"
+    iterations = 50
+
+    start = time.time()
+    signatures = [private_key.sign(message) for _ in range(iterations)]
+    print(f"签名: {(time.time() - start) / iterations * 1000:.2f} ms/次")
+
+    public_key = get_public_key(Q)
+    start = time.time()
+    results = [public_key.verify(message, sig) for sig in signatures]
+    print(f"验签（预计算公钥）: {(time.time() - start) / iterations * 1000:.2f} ms/次")
+    print(f"验签结果: {all(results)}")
+    print(f"篡改消息验签结果: {public_key.verify('这是一个被篡改的消息', signatures[0])}")
+    print(f"缓存命中: {get_public_key(Q) is public_key}")
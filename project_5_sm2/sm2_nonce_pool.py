@@ -0,0 +1,185 @@
+import secrets
+import threading
+from collections import deque
+from sm2 import n, mod_inverse, compute_e, batch_from_jacobian, get_G_table
+from sm2_keys import DEFAULT_USER_ID
+
+
+class PooledSigner:
+    """离线/在线SM2签名：后台线程预生成(k, x1)，在线签名只剩几次模乘
+
+    与消息无关的k*G在离线阶段批量计算（所有点一次批量归一化）。池容量不超过pool_size，
+    降到low_watermark及以下（或被取空）时后台开始补充，并持续补充直到pool_size；
+    每个k出池即删除，保证只使用一次。
+    池被取空时在线路径同步生成一个k，不会阻塞。
+    """
+
+    def __init__(self, private_key, pool_size=1024, low_watermark=256, refill_batch=64, start=True):
+        if pool_size <= 0:
+            raise ValueError("池容量必须为正数")
+        if not 0 <= low_watermark < pool_size:
+            raise ValueError("补充水位必须在[0, pool_size)之间")
+        if refill_batch <= 0:
+            raise ValueError("补充批大小必须为正数")
+
+        self.private_key = private_key
+        self.pool_size = pool_size
+        self.low_watermark = low_watermark
+        self.refill_batch = refill_batch
+
+        self._d = private_key.d
+        self._d_inv = mod_inverse((1 + self._d) % n, n)
+        self._pool = deque()
+        self._lock = threading.Lock()
+        self._need_refill = threading.Condition(self._lock)
+        self._stopped = False
+        self._filling = False  # 补充滞回：触发后一直补充到pool_size才清除
+        self._thread = None
+        self.generated = 0
+        self.pool_misses = 0
+
+        if start:
+            self.start()
+
+    @staticmethod
+    def _generate(count):
+        """离线阶段：生成count个(k, x1)，k*G批量归一化"""
+        table = get_G_table()
+        ks = [secrets.randbelow(n - 1) + 1 for _ in range(count)]
+        points = batch_from_jacobian([table.mul_ct(k) for k in ks])
+        return [(k, point[0]) for k, point in zip(ks, points) if point is not None]
+
+    def _refill_loop(self):
+        while True:
+            with self._lock:
+                while not self._stopped and not self._filling:
+                    self._need_refill.wait()
+                if self._stopped:
+                    return
+                missing = self.pool_size - len(self._pool)
+                if missing <= 0:
+                    self._filling = False
+                    continue
+            batch = self._generate(min(missing, self.refill_batch))
+            with self._lock:
+                room = self.pool_size - len(self._pool)
+                self._pool.extend(batch[:room])
+                self.generated += min(room, len(batch))
+                if len(self._pool) >= self.pool_size:
+                    self._filling = False
+
+    def start(self):
+        """启动后台补充线程"""
+        with self._lock:
+            self._stopped = False
+            self._filling = len(self._pool) < self.pool_size
+            if self._thread is not None and self._thread.is_alive():
+                return self
+            self._thread = threading.Thread(target=self._refill_loop, name="sm2-nonce-pool", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """停止后台线程并清空未使用的随机数"""
+        with self._lock:
+            self._stopped = True
+            self._filling = False
+            self._need_refill.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        with self._lock:
+            self._pool.clear()
+
+    def fill(self):
+        """同步填满随机数池（例如在接收请求前预热）"""
+        while True:
+            with self._lock:
+                missing = self.pool_size - len(self._pool)
+            if missing <= 0:
+                return
+            batch = self._generate(min(missing, self.refill_batch))
+            with self._lock:
+                room = self.pool_size - len(self._pool)
+                self._pool.extend(batch[:room])
+                self.generated += min(room, len(batch))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    @property
+    def size(self):
+        with self._lock:
+            return len(self._pool)
+
+    def _take(self):
+        """取出一个(k, x1)并从池中删除；池为空时同步生成"""
+        with self._lock:
+            if self._pool:
+                item = self._pool.popleft()
+                if not self._filling and len(self._pool) <= self.low_watermark:
+                    self._filling = True
+                    self._need_refill.notify()
+                return item
+            self.pool_misses += 1
+            self._filling = True
+            self._need_refill.notify()
+        return self._generate(1)[0]
+
+    def sign(self, M, user_id=DEFAULT_USER_ID):
+        """在线签名：r = e + x1，s = (1 + d)^-1 * (k - r*d)"""
+        e_int = compute_e(self.private_key.public_key.za(user_id), M)
+        while True:
+            k, x1 = self._take()
+            r = (e_int + x1) % n
+            if r != 0 and (r + k) % n != 0:
+                break
+        return (r, (self._d_inv * (k - r * self._d)) % n)
+
+
+# 测试代码
+if __name__ == "__main__":
+    import time
+    from sm2_keys import SM2PrivateKey
+
+    def percentiles(samples):
+        samples = sorted(samples)
+        return {q: samples[min(len(samples) - 1, int(len(samples) * q / 100))] * 1000 for q in (50, 90, 99)}
+
+    private_key = SM2PrivateKey.generate()
+    message = "突发负载下的签名测试消息"
+    burst = 1000  # 大于pool_size - low_watermark，池会降到水位以下
+
+    latencies = []
+    for _ in range(burst):
+        start = time.perf_counter()
+        private_key.sign(message)
+        latencies.append(time.perf_counter() - start)
+    base = percentiles(latencies)
+    print(f"普通签名:   p50={base[50]:.3f}ms p90={base[90]:.3f}ms p99={base[99]:.3f}ms")
+
+    with PooledSigner(private_key, pool_size=1024, low_watermark=256, start=False) as signer:
+        signer.fill()
+        signer.start()
+        latencies = []
+        signatures = []
+        for _ in range(burst):
+            start = time.perf_counter()
+            signatures.append(signer.sign(message))
+            latencies.append(time.perf_counter() - start)
+        pooled = percentiles(latencies)
+        print(f"随机数池签名: p50={pooled[50]:.3f}ms p90={pooled[90]:.3f}ms p99={pooled[99]:.3f}ms "
+              f"(池未命中{signer.pool_misses}次)")
+
+        # 突发之后后台应一直补充到pool_size，而不是刚越过水位就停止
+        after_burst = signer.size
+        deadline = time.perf_counter() + 30
+        while signer.size < signer.pool_size and time.perf_counter() < deadline:
+            time.sleep(0.1)
+        print(f"突发后池大小: {after_burst} -> 空闲补充后: {signer.size}/{signer.pool_size}")
+
+    print(f"验签结果: {all(private_key.public_key.verify(message, sig) for sig in signatures)}")
+    print(f"r互不相同（随机数未复用）: {len({r for r, _ in signatures}) == len(signatures)}")
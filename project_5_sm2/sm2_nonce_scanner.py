@@ -0,0 +1,255 @@
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from sm2 import n, compute_ZA, compute_e, base_point_mul, mod_inverse, decode_point
+from sm2_keys import DEFAULT_USER_ID
+
+
+def parse_point(text):
+    """解析十六进制公钥：SEC1压缩/非压缩编码或 x||y（128个字符）"""
+    text = text.strip().lower()
+    if text.startswith("0x"):
+        text = text[2:]
+    return decode_point(bytes.fromhex(text))
+
+
+def _parse_int(value):
+    return value if isinstance(value, int) else int(str(value).strip(), 16)
+
+
+def _parse_record(fields):
+    """字段字典 -> (Q, M字节, r, s, user_id, 泄露的k或None)
+
+    字段: Q, M（UTF-8文本）或 M_hex, r, s（十六进制或整数），可选 user_id（文本）与 k（泄露的随机数）
+    """
+    Q = parse_point(fields["Q"])
+    if fields.get("M_hex"):
+        M = bytes.fromhex(fields["M_hex"])
+    else:
+        M = fields["M"].encode("utf-8")
+    user_id = fields.get("user_id")
+    user_id = user_id.encode("utf-8") if user_id else DEFAULT_USER_ID
+    k = fields.get("k")
+    return Q, M, _parse_int(fields["r"]), _parse_int(fields["s"]), user_id, _parse_int(k) if k else None
+
+
+def iter_records(path):
+    """流式读取JSONL或CSV（按扩展名区分），逐条产出 (行号, 字段字典)"""
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.endswith(".csv"):
+            for line_no, row in enumerate(csv.DictReader(f), 2):
+                yield line_no, row
+        else:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield line_no, json.loads(line)
+                except json.JSONDecodeError:
+                    yield line_no, None
+
+
+def recover_from_reuse(sig1, sig2):
+    """同一k签出的两个签名恢复私钥：d = (s2 - s1) / (s1 - s2 + r1 - r2)，分母为0时返回None"""
+    (r1, s1), (r2, s2) = sig1, sig2
+    denominator = (s1 - s2 + r1 - r2) % n
+    if denominator == 0:
+        return None
+    return ((s2 - s1) * mod_inverse(denominator, n)) % n
+
+
+def recover_from_leak(k, signature):
+    """已知k恢复私钥：d = (k - s) / (s + r)"""
+    r, s = signature
+    denominator = (s + r) % n
+    if denominator == 0:
+        return None
+    return ((k - s) * mod_inverse(denominator, n)) % n
+
+
+def _recover_chunk(candidates):
+    """工作进程：对一组候选执行恢复公式，并用 d*G == Q 校验"""
+    results = []
+    for kind, Q, first, second, locations in candidates:
+        if kind == "reuse":
+            d = recover_from_reuse(first, second)
+        else:
+            d = recover_from_leak(first, second)
+        verified = d is not None and 0 < d < n and base_point_mul(d) == Q
+        results.append({
+            "kind": kind,
+            "Q": Q,
+            "locations": locations,
+            "d": d if verified else None,
+            "verified": verified,
+        })
+    return results
+
+
+class NonceScanner:
+    """SM2签名语料的随机数复用/泄露扫描器
+
+    每条签名由 x1 = (r - e) mod n 反推出k*G的横坐标，按(Q, x1)放入哈希表，
+    同一公钥下x1相同即为k复用（O(N)一遍扫描）。ZA按(Q, user_id)缓存，e逐条只做一次SM3。
+    候选不按公钥限量：每个(Q, x1)取第一对复用签名、每个不同的(Q, 泄露k)各排队一个，
+    错误的泄露k不会挡住同一公钥后面真正的复用对；恢复时每个公钥取通过d*G == Q校验的候选。
+    同一(Q, x1)中其余的复用对只记录位置。
+    """
+
+    def __init__(self):
+        self._seen = {}        # (Q, x1) -> (位置, (r, s))
+        self._za_cache = {}
+        self._queued = set()   # 已排队的 ("reuse", Q, x1) / ("leak", Q, k)
+        self.candidates = []   # (类型, Q, 数据1, 数据2, 位置列表)
+        self.reused = []       # 所有复用对的位置 (Q, 位置1, 位置2)
+        self.stats = {"records": 0, "malformed": 0, "duplicates": 0}
+
+    def _za(self, Q, user_id):
+        key = (Q, user_id)
+        za = self._za_cache.get(key)
+        if za is None:
+            za = compute_ZA(Q, user_id)
+            self._za_cache[key] = za
+        return za
+
+    def add(self, fields, location=None):
+        """加入一条记录（字段字典），location为(文件, 行号)等定位信息"""
+        self.stats["records"] += 1
+        try:
+            Q, M, r, s, user_id, k = _parse_record(fields)
+        except (KeyError, ValueError, TypeError, AttributeError):
+            self.stats["malformed"] += 1
+            return
+        if not (0 < r < n and 0 < s < n):
+            self.stats["malformed"] += 1
+            return
+
+        if k is not None:
+            self._queue(("leak", Q, k), "leak", Q, k, (r, s), [location])
+
+        x1 = (r - compute_e(self._za(Q, user_id), M)) % n
+        entry = (location, (r, s))
+        previous = self._seen.setdefault((Q, x1), entry)
+        if previous is entry:
+            return
+        if previous[1] == (r, s):
+            # 同一消息的重复签名：分母为0，无法恢复
+            self.stats["duplicates"] += 1
+            return
+        self.reused.append((Q, previous[0], location))
+        self._queue(("reuse", Q, x1), "reuse", Q, previous[1], (r, s), [previous[0], location])
+
+    def _queue(self, dedup_key, kind, Q, first, second, locations):
+        if dedup_key not in self._queued:
+            self._queued.add(dedup_key)
+            self.candidates.append((kind, Q, first, second, locations))
+
+    def add_file(self, path):
+        for line_no, fields in iter_records(path):
+            if fields is None:
+                self.stats["records"] += 1
+                self.stats["malformed"] += 1
+                continue
+            self.add(fields, (path, line_no))
+
+    def recover(self, processes=None, chunk_size=64):
+        """并行恢复私钥，返回每个受影响公钥的结果列表（有通过校验的候选时取之，否则取第一个候选）"""
+        chunks = [self.candidates[i:i + chunk_size] for i in range(0, len(self.candidates), chunk_size)]
+        if not processes or processes <= 1 or len(chunks) <= 1:
+            results = [result for chunk in chunks for result in _recover_chunk(chunk)]
+        else:
+            with ProcessPoolExecutor(max_workers=processes) as pool:
+                results = [result for chunk_result in pool.map(_recover_chunk, chunks) for result in chunk_result]
+
+        findings = {}
+        for result in results:
+            current = findings.get(result["Q"])
+            if current is None or (result["verified"] and not current["verified"]):
+                findings[result["Q"]] = result
+        return list(findings.values())
+
+
+def scan(paths, processes=None):
+    """扫描若干JSONL/CSV文件
+
+    返回:
+        (恢复结果列表, 统计信息{"records", "malformed", "duplicates", "keys", "reused_pairs",
+                              "recovered", "seconds", "throughput"（条/秒）})
+    """
+    start = time.perf_counter()
+    scanner = NonceScanner()
+    for path in paths:
+        scanner.add_file(path)
+    findings = scanner.recover(processes)
+
+    seconds = time.perf_counter() - start
+    stats = dict(scanner.stats)
+    stats.update({
+        "keys": len({Q for Q, _ in scanner._seen}),
+        "reused_pairs": len(scanner.reused),
+        "recovered": sum(1 for finding in findings if finding["verified"]),
+        "seconds": seconds,
+        "throughput": stats["records"] / seconds if seconds > 0 else float('inf'),
+    })
+    return findings, stats
+
+
+# 测试代码
+if __name__ == "__main__":
+    import random
+    import sys
+    import tempfile
+    from sm2 import base_point_mul_ct
+    from sm2_keys import SM2PrivateKey
+
+    if len(sys.argv) > 1:
+        findings, stats = scan(sys.argv[1:], processes=os.cpu_count())
+        print(json.dumps(stats, ensure_ascii=False))
+        for finding in findings:
+            print(f"{finding['kind']}: Q={finding['Q'][0]:064x}... 位置={finding['locations']} "
+                  f"私钥已恢复={finding['verified']}")
+        sys.exit(0)
+
+    def record(key, message, signature, leaked_k=None):
+        Q = key.public_key.point
+        fields = {"Q": f"{Q[0]:064x}{Q[1]:064x}", "M": message, "r": f"{signature[0]:x}", "s": f"{signature[1]:x}"}
+        if leaked_k is not None:
+            fields["k"] = f"{leaked_k:x}"
+        return json.dumps(fields)
+
+    def sign_with_k(key, message, k):
+        e_int = compute_e(key.public_key.za(), message)
+        r = (e_int + base_point_mul_ct(k)[0]) % n
+        return r, (mod_inverse(1 + key.d, n) * (k - r * key.d)) % n
+
+    keys = [SM2PrivateKey.generate() for _ in range(20)]
+    reuse_victim, leak_victim = keys[3], keys[7]
+    k = random.randint(1, n - 1)
+    leaked = random.randint(1, n - 1)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "signatures.jsonl")
+        with open(path, "w", encoding="utf-8") as f:
+            for i in range(2000):
+                key = random.choice(keys)
+                message = f"交易记录 {i}"
+                f.write(record(key, message, key.sign(message)) + "\n")
+                if i == 500:
+                    f.write(record(reuse_victim, "复用k的消息1", sign_with_k(reuse_victim, "复用k的消息1", k)) + "\n")
+                if i == 1500:
+                    f.write(record(reuse_victim, "复用k的消息2", sign_with_k(reuse_victim, "复用k的消息2", k)) + "\n")
+                    f.write(record(leak_victim, "泄露k的消息", sign_with_k(leak_victim, "泄露k的消息", leaked),
+                                   leaked) + "\n")
+
+        findings, stats = scan([path], processes=os.cpu_count())
+
+    print(f"扫描{stats['records']}条记录（{stats['keys']}个公钥）: {stats['seconds']:.2f}秒, "
+          f"{stats['throughput']:.0f} 条/秒")
+    print(f"发现复用对: {stats['reused_pairs']}, 恢复私钥: {stats['recovered']}")
+    for finding in findings:
+        expected = reuse_victim.d if finding["kind"] == "reuse" else leak_victim.d
+        print(f"  {finding['kind']}: 行号 {[loc[1] for loc in finding['locations']]}, "
+              f"恢复正确: {finding['d'] == expected}")
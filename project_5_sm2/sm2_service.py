@@ -0,0 +1,385 @@
+import asyncio
+import json
+import os
+import socket
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from sm2 import n, get_G_table, decode_point
+from sm2_batch import _verify_chunk
+from sm2_keys import SM2PrivateKey
+
+# 协议：每行一个JSON请求/响应（Unix套接字，不支持时可传(host, port)改用本机TCP）
+#   {"id": 1, "op": "sign", "key_id": "k1", "M": "文本"}          -> {"id": 1, "r": "hex", "s": "hex"}
+#   {"id": 2, "op": "verify", "Q": "hex", "M": "文本", "r": "hex", "s": "hex"} -> {"id": 2, "valid": true}
+#       Q可以是SEC1压缩/非压缩编码或64字节 x||y
+#   {"id": 3, "op": "public_key", "key_id": "k1"}                -> {"id": 3, "Q": "x||y hex"}
+#   {"id": 4, "op": "metrics"}                                   -> {"id": 4, "metrics": {...}}
+# 出错时返回 {"id": ..., "error": "原因"}；队列满时返回 "overloaded"，由客户端自行退避重试。
+
+
+# ---------- 工作进程 ----------
+_WORKER_KEYS = {}
+
+
+def _init_worker(keys):
+    """工作进程初始化：预热基点表（设置SM2_G_TABLE_PATH时从磁盘加载）并构建私钥对象"""
+    get_G_table()
+    for key_id, d in keys.items():
+        _WORKER_KEYS[key_id] = SM2PrivateKey(d)
+
+
+def _worker_sign(batch):
+    """批量签名 [(key_id, M)]，未知key_id对应None；单条出错只返回该条的异常，不影响同批其他请求"""
+    results = []
+    for key_id, M in batch:
+        key = _WORKER_KEYS.get(key_id)
+        if key is None:
+            results.append(None)
+            continue
+        try:
+            results.append(key.sign(M))
+        except Exception as exc:
+            results.append(exc)
+    return results
+
+
+def _worker_verify(batch):
+    """批量验签 [(M, (r, s), Q)]"""
+    return _verify_chunk(batch)
+
+
+# ---------- 指标 ----------
+class OpMetrics:
+    """单类操作的计数、批大小与最近window次请求的延迟分位数"""
+
+    def __init__(self, window=10000):
+        self.count = 0
+        self.errors = 0
+        self.batches = 0
+        self.batched_items = 0
+        self.latencies = deque(maxlen=window)
+
+    def record(self, latency, ok=True):
+        self.count += 1
+        if not ok:
+            self.errors += 1
+        self.latencies.append(latency)
+
+    def snapshot(self, elapsed):
+        samples = sorted(self.latencies)
+
+        def percentile(q):
+            return samples[min(len(samples) - 1, int(len(samples) * q / 100))] * 1000 if samples else 0.0
+
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "throughput": self.count / elapsed if elapsed > 0 else 0.0,
+            "p50_ms": percentile(50),
+            "p99_ms": percentile(99),
+            "mean_batch": self.batched_items / self.batches if self.batches else 0.0,
+        }
+
+
+# ---------- 服务 ----------
+def _message(request):
+    """取出待签/待验消息：M必须是文本，M_hex必须是合法十六进制；在入队前校验，避免坏请求拖累整批"""
+    if "M_hex" in request:
+        if not isinstance(request["M_hex"], str):
+            raise TypeError("M_hex must be a hex string")
+        return bytes.fromhex(request["M_hex"])
+    if not isinstance(request["M"], str):
+        raise TypeError("M must be a string")
+    return request["M"]
+
+
+class SM2Service:
+    """本地SM2签名/验签服务
+
+    请求进入有界队列，后台批处理协程按max_batch条或max_delay秒凑成一批，
+    交给预热过的进程池（每个进程持有基点表与私钥对象）执行；验签批次走批量验签。
+    背压：队列满时立即返回overloaded，同时在途批次数受限于max_inflight，
+    每个连接的未完成请求数受限于max_per_connection（超出后暂停读取该连接）。
+    """
+
+    OPS = ("sign", "verify")
+
+    def __init__(self, keys, address, workers=None, max_batch=64, max_delay=0.002,
+                 max_pending=4096, max_inflight=None, max_per_connection=256):
+        self.keys = dict(keys)
+        self.address = address
+        self.workers = workers or os.cpu_count() or 1
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.max_pending = max_pending
+        self.max_inflight = max_inflight or 2 * self.workers
+        self.max_per_connection = max_per_connection
+
+        self.public_keys = {}
+        self.metrics = {op: OpMetrics() for op in self.OPS}
+        self._queues = {}
+        self._tasks = []
+        self._pool = None
+        self._server = None
+        self._inflight = None
+        self._started_at = None
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        self.public_keys = {key_id: SM2PrivateKey(d).public_key.point for key_id, d in self.keys.items()}
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_init_worker, initargs=(self.keys,)
+        )
+        # 等所有工作进程完成预热再开始接收请求
+        await asyncio.gather(*[loop.run_in_executor(self._pool, _worker_sign, [])
+                               for _ in range(self.workers)])
+
+        self._inflight = asyncio.Semaphore(self.max_inflight)
+        for op, worker_fn in (("sign", _worker_sign), ("verify", _worker_verify)):
+            self._queues[op] = asyncio.Queue(self.max_pending)
+            self._tasks.append(asyncio.ensure_future(self._batcher(op, worker_fn)))
+
+        if isinstance(self.address, str):
+            if os.path.exists(self.address):
+                os.unlink(self.address)
+            self._server = await asyncio.start_unix_server(self._handle_client, path=self.address)
+        else:
+            host, port = self.address
+            self._server = await asyncio.start_server(self._handle_client, host, port)
+        self._started_at = time.perf_counter()
+        return self
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._pool is not None:
+            self._pool.shutdown()
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.unlink(self.address)
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    def snapshot(self):
+        elapsed = time.perf_counter() - self._started_at if self._started_at else 0.0
+        result = {op: metrics.snapshot(elapsed) for op, metrics in self.metrics.items()}
+        result["pending"] = {op: queue.qsize() for op, queue in self._queues.items()}
+        return result
+
+    async def _batcher(self, op, worker_fn):
+        loop = asyncio.get_running_loop()
+        queue = self._queues[op]
+        while True:
+            batch = [await queue.get()]
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.max_batch:
+                if not queue.empty():
+                    batch.append(queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self._inflight.acquire()
+            asyncio.ensure_future(self._run_batch(op, worker_fn, batch))
+
+    async def _run_batch(self, op, worker_fn, batch):
+        loop = asyncio.get_running_loop()
+        metrics = self.metrics[op]
+        try:
+            results = await loop.run_in_executor(self._pool, worker_fn, [payload for payload, _, _ in batch])
+        except Exception as exc:
+            results = [exc] * len(batch)
+        finally:
+            self._inflight.release()
+        metrics.batches += 1
+        metrics.batched_items += len(batch)
+        now = time.perf_counter()
+        for (_, future, started), result in zip(batch, results):
+            ok = result is not None and not isinstance(result, Exception)
+            metrics.record(now - started, ok)
+            if not future.done():
+                future.set_result(result)
+
+    async def _submit(self, op, payload):
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queues[op].put_nowait((payload, future, time.perf_counter()))
+        except asyncio.QueueFull:
+            self.metrics[op].errors += 1
+            raise OverflowError("overloaded")
+        return await future
+
+    async def dispatch(self, request):
+        """处理一个请求字典，返回响应字典"""
+        response = {"id": request.get("id")}
+        op = request.get("op")
+        try:
+            if op == "sign":
+                if request.get("key_id") not in self.keys:
+                    raise KeyError("unknown key_id")
+                result = await self._submit("sign", (request["key_id"], _message(request)))
+                if result is None or isinstance(result, Exception):
+                    raise RuntimeError("sign failed")
+                response.update({"r": f"{result[0]:064x}", "s": f"{result[1]:064x}"})
+            elif op == "verify":
+                r, s = int(request["r"], 16), int(request["s"], 16)
+                Q = decode_point(bytes.fromhex(request["Q"]))
+                result = await self._submit("verify", (_message(request), (r, s), Q))
+                if isinstance(result, Exception):
+                    raise RuntimeError("verify failed")
+                response["valid"] = bool(result) and 0 < r < n
+            elif op == "public_key":
+                Q = self.public_keys[request["key_id"]]
+                response["Q"] = f"{Q[0]:064x}{Q[1]:064x}"
+            elif op == "metrics":
+                response["metrics"] = self.snapshot()
+            else:
+                raise ValueError("unknown op")
+        except OverflowError:
+            response["error"] = "overloaded"
+        except (KeyError, ValueError, TypeError, RuntimeError) as exc:
+            response["error"] = str(exc).strip("'\"") or type(exc).__name__
+        return response
+
+    async def _handle_client(self, reader, writer):
+        write_lock = asyncio.Lock()
+        slots = asyncio.Semaphore(self.max_per_connection)
+        pending = set()
+
+        async def respond(request):
+            try:
+                try:
+                    response = await self.dispatch(request)
+                except Exception:
+                    # 兜底：未预料的异常也要回写错误响应，否则客户端会一直等待
+                    response = {"id": request.get("id"), "error": "internal error"}
+                async with write_lock:
+                    writer.write((json.dumps(response) + "\n").encode())
+                    await writer.drain()
+            except (ConnectionError, asyncio.CancelledError):
+                pass
+            finally:
+                slots.release()
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                except ValueError:  # JSONDecodeError与非UTF-8输入
+                    request = None
+                if not isinstance(request, dict):
+                    # 能解析但不是对象（如[1]、5）同样按无效请求处理
+                    request = {"op": None}
+                await slots.acquire()
+                task = asyncio.ensure_future(respond(request))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+        finally:
+            writer.close()
+
+
+class SM2Client:
+    """同步客户端：一个连接上顺序收发请求"""
+
+    def __init__(self, address):
+        family = socket.AF_UNIX if isinstance(address, str) else socket.AF_INET
+        self._sock = socket.socket(family, socket.SOCK_STREAM)
+        self._sock.connect(address)
+        self._file = self._sock.makefile("rwb")
+        self._next_id = 0
+
+    def request(self, op, **fields):
+        self._next_id += 1
+        fields.update({"id": self._next_id, "op": op})
+        self._file.write((json.dumps(fields) + "\n").encode())
+        self._file.flush()
+        return json.loads(self._file.readline())
+
+    def close(self):
+        self._file.close()
+        self._sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+# 测试代码
+if __name__ == "__main__":
+    import random
+    import tempfile
+
+    async def run_client(address, requests, concurrency):
+        """流水线客户端：同一连接上最多concurrency个未完成请求"""
+        if isinstance(address, str):
+            reader, writer = await asyncio.open_unix_connection(address)
+        else:
+            reader, writer = await asyncio.open_connection(*address)
+        responses = {}
+        sent = 0
+        for request_id, request in enumerate(requests):
+            request = dict(request, id=request_id)
+            writer.write((json.dumps(request) + "\n").encode())
+            sent += 1
+            if sent - len(responses) >= concurrency:
+                response = json.loads(await reader.readline())
+                responses[response["id"]] = response
+        await writer.drain()
+        while len(responses) < sent:
+            response = json.loads(await reader.readline())
+            responses[response["id"]] = response
+        writer.close()
+        return [responses[i] for i in range(sent)]
+
+    async def demo():
+        keys = {f"key-{i}": SM2PrivateKey.generate().d for i in range(4)}
+        with tempfile.TemporaryDirectory() as tmp:
+            address = os.path.join(tmp, "sm2.sock") if hasattr(socket, "AF_UNIX") else ("127.0.0.1", 8622)
+            start = time.perf_counter()
+            async with SM2Service(keys, address) as service:
+                print(f"服务启动（{service.workers}个工作进程，含预热）: {time.perf_counter() - start:.2f}秒")
+
+                count = 400
+                messages = [(random.choice(list(keys)), f"服务签名消息 {i}") for i in range(count)]
+                start = time.perf_counter()
+                signed = await run_client(address, [{"op": "sign", "key_id": k, "M": m} for k, m in messages], 128)
+                print(f"签名: {count / (time.perf_counter() - start):.1f} 次/秒")
+
+                verify_requests = []
+                for (key_id, message), response in zip(messages, signed):
+                    Q = service.public_keys[key_id]
+                    verify_requests.append({"op": "verify", "Q": f"{Q[0]:064x}{Q[1]:064x}", "M": message,
+                                            "r": response["r"], "s": response["s"]})
+                verify_requests[7]["M"] = "被篡改的消息"
+                start = time.perf_counter()
+                verified = await run_client(address, verify_requests, 256)
+                print(f"验签: {count / (time.perf_counter() - start):.1f} 次/秒, "
+                      f"失败条目: {[i for i, r in enumerate(verified) if not r.get('valid')]}")
+
+                metrics = (await run_client(address, [{"op": "metrics"}], 1))[0]["metrics"]
+                for op in SM2Service.OPS:
+                    m = metrics[op]
+                    print(f"{op}: {m['count']}次, 错误{m['errors']}, p50={m['p50_ms']:.1f}ms, "
+                          f"p99={m['p99_ms']:.1f}ms, 平均批大小{m['mean_batch']:.1f}")
+
+    asyncio.run(demo())